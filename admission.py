@@ -0,0 +1,104 @@
+"""
+Admission control for request classes.
+
+Each class (realtime taps, admin CRUD, batch reports) has its own concurrency
+limit and bounded wait queue. A request that cannot get a slot before its
+queue timeout, or finds the queue full, is rejected with Overloaded so the
+caller can answer 429. Batch work also yields to realtime: it does not start,
+and pauses at its checkpoints, while any tap is queued or running.
+"""
+import threading
+import time
+
+
+class Overloaded(Exception):
+    def __init__(self, route_class, retry_after):
+        super().__init__("%s requests over capacity" % route_class)
+        self.route_class = route_class
+        self.retry_after = retry_after
+
+
+class RouteClass:
+    def __init__(self, name, concurrency, queue, queue_timeout, retry_after):
+        self.name = name
+        self.concurrency = concurrency
+        self.queue = queue
+        self.queue_timeout = queue_timeout
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+
+
+class AdmissionController:
+    def __init__(self, limits, realtime_class="realtime", batch_class="batch", max_pause=2.0):
+        """
+        limits: {class name: {"concurrency", "queue", "queue_timeout", "retry_after"}}
+        max_pause: longest a batch request waits for realtime to go idle at one checkpoint
+        """
+        self.classes = {name: RouteClass(name, **cfg) for name, cfg in limits.items()}
+        self.realtime_class = realtime_class
+        self.batch_class = batch_class
+        self.max_pause = max_pause
+        self._cond = threading.Condition()
+
+    def _realtime_pending(self):
+        rt = self.classes[self.realtime_class]
+        return rt.active + rt.waiting
+
+    def realtime_busy(self):
+        with self._cond:
+            return self._realtime_pending() > 0
+
+    def _set_pending(self, cls, attr, delta):
+        was_busy = self._realtime_pending() > 0
+        setattr(cls, attr, getattr(cls, attr) + delta)
+        is_busy = self._realtime_pending() > 0
+        if cls.name == self.realtime_class and was_busy != is_busy:
+            self._cond.notify_all()
+
+    def acquire(self, name):
+        cls = self.classes[name]
+        now = time.monotonic()
+        deadline = now + cls.queue_timeout
+        # Reports hold back while taps are pending, but never past max_pause
+        hold_until = now + self.max_pause if name == self.batch_class else now
+        with self._cond:
+            if cls.waiting >= cls.queue:
+                cls.rejected += 1
+                raise Overloaded(name, cls.retry_after)
+            self._set_pending(cls, "waiting", 1)
+            try:
+                while True:
+                    now = time.monotonic()
+                    held = self._realtime_pending() and now < hold_until
+                    if cls.active < cls.concurrency and not held:
+                        break
+                    if now >= deadline:
+                        cls.rejected += 1
+                        raise Overloaded(name, cls.retry_after)
+                    self._cond.wait((min(deadline, hold_until) if held else deadline) - now)
+                self._set_pending(cls, "active", 1)
+            finally:
+                self._set_pending(cls, "waiting", -1)
+
+    def release(self, name):
+        with self._cond:
+            self._set_pending(self.classes[name], "active", -1)
+            self._cond.notify_all()
+
+    def yield_to_realtime(self):
+        """Checkpoint for long batch work: pause while taps are pending (bounded by max_pause)."""
+        deadline = time.monotonic() + self.max_pause
+        with self._cond:
+            while self._realtime_pending():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                self._cond.wait(remaining)
+
+    def stats(self):
+        with self._cond:
+            return {c.name: {"active": c.active, "waiting": c.waiting, "rejected": c.rejected,
+                             "concurrency": c.concurrency, "queue": c.queue}
+                    for c in self.classes.values()}
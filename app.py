@@ -1,4 +1,4 @@
-from flask import Flask, request, render_template, redirect, url_for, jsonify
+from flask import Flask, Blueprint, request, render_template, redirect, url_for, jsonify, current_app, g, send_from_directory
 from pymongo import MongoClient
 from bson.objectid import ObjectId
 from datetime import datetime, timedelta
@@ -6,248 +6,620 @@ from collections import defaultdict
 import pymongo 
 from flask_cors import CORS
 import threading
-
-app = Flask(__name__)
-CORS(app)  # <-- allow all origins
+import time
+import os
+import hmac
+import signal
+import tempfile
+
+from invalidation import InvalidationBus
+from log_pipeline import build_summary_pipeline, format_summary_row
+from admission import AdmissionController, Overloaded
+from permissions import CabinIndex, assign_cabin_bits, bit_update, decode_bits, encode_bits
+from profiling import RequestProfiler, SamplingProfiler, positive_number
+
+# Taken as early as possible so startup timings cover imports as well.
+PROCESS_START = time.monotonic()
+
+MONGO_URI = os.environ.get("MONGO_URI", "mongodb://10.80.3.148:27017/")
+MONGO_DB = os.environ.get("MONGO_DB", "Transaction_project")
+MONGO_MIN_POOL = int(os.environ.get("MONGO_MIN_POOL", "4"))
+# Set by workers.py so sibling worker processes can invalidate each other's caches
+INVALIDATION_DIR = os.environ.get("INVALIDATION_DIR")
+REPORT_CACHE_TTL = float(os.environ.get("REPORT_CACHE_TTL", "60"))
+REPORT_CACHE_SIZE = int(os.environ.get("REPORT_CACHE_SIZE", "256"))
+# Full re-read of the lookup cache, so writes this process never heard about (app.js, the
+# mongo shell, a lost invalidation) show up within this many seconds; 0 disables it
+LOOKUP_RESYNC_SECONDS = float(os.environ.get("LOOKUP_RESYNC_SECONDS", "60"))
+# "python" pulls raw logs and runs process_all_logs; "pipeline" summarizes inside MongoDB
+LOGS_ENGINES = ("python", "pipeline")
+LOGS_ENGINE = os.environ.get("LOGS_ENGINE", "python")
+# Reports get their own, smaller connection pool so they cannot starve taps
+MONGO_BATCH_POOL = int(os.environ.get("MONGO_BATCH_POOL", "4"))
+REPORT_BATCH_SIZE = 1000
+
+# Per route class: concurrent requests, queued requests, max queue wait (s), Retry-After (s) on 429
+ADMISSION_LIMITS = {
+    "realtime": {"concurrency": 16, "queue": 256, "queue_timeout": 2.0, "retry_after": 1},
+    "admin": {"concurrency": 8, "queue": 32, "queue_timeout": 5.0, "retry_after": 2},
+    "batch": {"concurrency": 2, "queue": 8, "queue_timeout": 10.0, "retry_after": 10},
+}
+ROUTE_CLASSES = {
+    "transactions.api_submit": "realtime",
+    "transactions.view_logs": "batch",
+    "transactions.get_list": "batch",
+}
+UNSCHEDULED_ROUTES = {"transactions.health", "transactions.ready", "transactions.start_profile",
+                      "transactions.profile_status", "transactions.download_profile"}
+
+# Profiling is off unless PROFILING_ENABLED=1; PROFILE_TOKEN, when set, must be sent as X-Profile-Token
+PROFILING_ENABLED = os.environ.get("PROFILING_ENABLED", "0") == "1"
+PROFILE_TOKEN = os.environ.get("PROFILE_TOKEN", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", os.path.join(tempfile.gettempdir(), "transaction-profiles"))
+PROFILE_SIGNAL_SECONDS = float(os.environ.get("PROFILE_SIGNAL_SECONDS", "10"))
+# Werkzeug debugger (runs arbitrary code from the browser); local development only
+FLASK_DEBUG = os.environ.get("FLASK_DEBUG", "0") == "1"
+
+bp = Blueprint("transactions", __name__)
 
 lock = threading.Lock()
-priority_active = threading.Event()
 
-# Connect to MongoDB
-client = MongoClient("mongodb://10.80.3.148:27017/")
-db = client["Transaction_project"]
-collection = db["users"]
-cabin_collection = db["cabins"]
 
+# ---------- DATABASE (lazy) ----------
+_clients = {}
+_client_lock = threading.Lock()
 
 
-from collections import defaultdict
-from datetime import datetime, timedelta
+def get_client(pool="default"):
+    """Create the MongoClient for a pool ("default" or "batch") on first use instead of at import time."""
+    if pool not in _clients:
+        with _client_lock:
+            if pool not in _clients:
+                if pool == "batch":
+                    _clients[pool] = MongoClient(MONGO_URI, maxPoolSize=MONGO_BATCH_POOL)
+                else:
+                    _clients[pool] = MongoClient(MONGO_URI, minPoolSize=MONGO_MIN_POOL)
+    return _clients[pool]
 
 
-from collections import defaultdict
-from datetime import datetime, timedelta
+def get_db(pool="default"):
+    return get_client(pool)[MONGO_DB]
 
-# def process_all_logs(logs, result_container, query_name=None, query_rfid=None, query_date=None, query_cabin_id=None):
-#     """
-#     logs: list of log dicts (may be empty)
-#     result_container: dict used to store "summary"
-#     query_name: str or list of names (from query)
-#     query_rfid: str or list of rfids (from query)
-#     query_date: str date (from query)
-#     """
-
-#     # Normalize query inputs to lists
-#     def to_list(x):
-#         if x is None:
-#             return []
-#         if isinstance(x, list):
-#             return x
-#         if isinstance(x, str) and "," in x:
-#             return [i.strip() for i in x.split(",") if i.strip()]
-#         return [x]
-
-#     q_names = to_list(query_name)
-#     q_rfids = to_list(query_rfid)
-#     q_date = query_date if query_date else ""
-
-#     # If no logs at all → return Absent rows using original query details
-#     if not logs:
-#         summaries = []
-#         if q_names and q_rfids and len(q_names) == len(q_rfids):
-#             for n, r in zip(q_names, q_rfids):
-#                 summaries.append({
-#                     "name": n,
-#                     "rfid": r,
-#                     "date": q_date,
-#                     "login_time": "",
-#                     "logout_time": "",
-#                     "Effective_login": "",
-#                     "Break_hours": "",
-#                     "Total_login": "",
-#                     "errors": "Absent"
-#                 })
-#         elif q_names:
-#             first_rfid = q_rfids[0] if q_rfids else ""
-#             for n in q_names:
-#                 summaries.append({
-#                     "name": n,
-#                     "rfid": first_rfid,
-#                     "date": q_date,
-#                     "login_time": "",
-#                     "logout_time": "",
-#                     "Effective_login": "",
-#                     "Break_hours": "",
-#                     "Total_login": "",
-#                     "errors": "Absent"
-#                 })
-#         elif q_rfids:
-#             first_name = q_names[0] if q_names else ""
-#             for r in q_rfids:
-#                 summaries.append({
-#                     "name": first_name,
-#                     "rfid": r,
-#                     "date": q_date,
-#                     "login_time": "",
-#                     "logout_time": "",
-#                     "Effective_login": "",
-#                     "Break_hours": "",
-#                     "Total_login": "",
-#                     "errors": "Absent"
-#                 })
-#         else:
-#             summaries.append({
-#                 "name": "",
-#                 "rfid": "",
-#                 "date": q_date,
-#                 "login_time": "",
-#                 "logout_time": "",
-#                 "Effective_login": "",
-#                 "Break_hours": "",
-#                 "Total_login": "",
-#                 "errors": "Absent"
-#             })
-
-#         result_container["summary"] = summaries
-#         return
-
-#     # --- Normal processing when logs exist ---
-#     grouped_logs = defaultdict(list)
-#     for log in logs:
-#         grouped_logs[(log.get("Name", ""), log.get("RFID", ""), log.get("date", ""))].append(log)
-    
-#     summaries = []
-#     present_pairs = set()
-#     present_names = set()
-#     present_rfids = set()
 
-#     for (name, rfid, date), person_logs in grouped_logs.items():
-#         present_pairs.add((name, rfid))
-#         present_names.add(name)
-#         present_rfids.add(rfid)
+class LazyCollection:
+    """Stands in for a pymongo collection and resolves it on first attribute access."""
 
-#         logs_sorted = sorted(person_logs, key=lambda x: x.get("time", ""))
-        
-#         # defensive datetime parsing
-#         for log in logs_sorted:
-#             dt_str_date = log.get("date", "")
-#             dt_str_time = log.get("time", "")
-#             try:
-#                 log["datetime"] = datetime.strptime(f'{dt_str_date} {dt_str_time}', "%Y-%m-%d %H:%M:%S")
-#             except Exception:
-#                 log["datetime"] = None
-        
-#         login_time, logout_time = None, None
-#         total_login = 0
-#         errors = []
-#         in_time = None
-        
-#         for log in logs_sorted:
-#             action = log.get("IN/OUT", "")
-#             dt = log.get("datetime")
-
-#             if action == "IN":
-#                 if in_time is None:
-#                     if dt:
-#                         in_time = dt
-#                         if login_time is None:
-#                             login_time = in_time
-#                     else:
-#                         errors.append(f"Bad IN datetime at {log.get('time', '')}")
-#                 else:
-#                     errors.append(f"Duplicate IN at {log.get('time', '')}")
-            
-#             elif action == "OUT":
-#                 if in_time is not None and dt:
-#                     total_login += (dt - in_time).total_seconds()
-#                     logout_time = dt
-#                     in_time = None
-#                 else:
-#                     errors.append(f"Unexpected OUT at {log.get('time', '')}")
-        
-#         if in_time is not None:
-#             try:
-#                 errors.append(f"Missing OUT after {in_time.strftime('%H:%M:%S')}")
-#             except Exception:
-#                 errors.append("Missing OUT after unknown time")
-        
-#         total_break = 0
-#         if login_time and logout_time:
-#             total_duration = (logout_time - login_time).total_seconds()
-#             total_break = total_duration - total_login
-#             time_spent = str(logout_time - login_time)
-#         else:
-#             time_spent = ""
-        
-#         summaries.append({
-#             "name": name,
-#             "rfid": rfid,
-#             "date": date,
-#             "login_time": login_time.strftime("%H:%M:%S") if login_time else "",
-#             "logout_time": logout_time.strftime("%H:%M:%S") if logout_time else "",
-#             "Effective_login": str(timedelta(seconds=total_login)) if total_login else "",
-#             "Break_hours": str(timedelta(seconds=total_break)) if total_break else "",
-#             "Total_login": time_spent,
-#             "errors": errors if errors else "Absent"
-#         })
-
-#     # --- Add Absent rows for requested names/rfids that weren't present in DB result --- #
-#     # Pairwise when lengths match
-#     if q_names and q_rfids and len(q_names) == len(q_rfids):
-#         for n, r in zip(q_names, q_rfids):
-#             if (n, r) not in present_pairs:
-#                 summaries.append({
-#                     "name": n,
-#                     "rfid": r,
-#                     "date": q_date,
-#                     "login_time": "",
-#                     "logout_time": "",
-#                     "Effective_login": "",
-#                     "Break_hours": "",
-#                     "Total_login": "",
-#                     "errors": "Absent"
-#                 })
-#     # If only names requested -> add per name not present
-#     elif q_names:
-#         first_rfid = q_rfids[0] if q_rfids else ""
-#         for n in q_names:
-#             if n not in present_names:
-#                 summaries.append({
-#                     "name": n,
-#                     "rfid": first_rfid,
-#                     "date": q_date,
-#                     "login_time": "",
-#                     "logout_time": "",
-#                     "Effective_login": "",
-#                     "Break_hours": "",
-#                     "Total_login": "",
-#                     "errors": "Absent"
-#                 })
-#     # If only rfids requested -> add per rfid not present
-#     elif q_rfids:
-#         first_name = q_names[0] if q_names else ""
-#         for r in q_rfids:
-#             if r not in present_rfids:
-#                 summaries.append({
-#                     "name": first_name,
-#                     "rfid": r,
-#                     "date": q_date,
-#                     "login_time": "",
-#                     "logout_time": "",
-#                     "Effective_login": "",
-#                     "Break_hours": "",
-#                     "Total_login": "",
-#                     "errors": "Absent"
-#                 })
-
-#     result_container["summary"] = summaries
+    def __init__(self, name, pool="default"):
+        self.name = name
+        self.pool = pool
+
+    def __getattr__(self, attr):
+        return getattr(get_db(self.pool)[self.name], attr)
+
+
+collection = LazyCollection("users")
+cabin_collection = LazyCollection("cabins")
+logs_collection = LazyCollection("logs")
+counters_collection = LazyCollection("counters")
+batch_users_collection = LazyCollection("users", pool="batch")
+batch_logs_collection = LazyCollection("logs", pool="batch")
+
+
+def ensure_indexes():
+    collection.create_index("RFID")
+    cabin_collection.create_index("ID")
+    logs_collection.create_index([("date", pymongo.ASCENDING), ("RFID", pymongo.ASCENDING)])
+    logs_collection.create_index([("date", pymongo.ASCENDING), ("Log_Cabin", pymongo.ASCENDING)])
+
+
+# ---------- CABIN PERMISSIONS ----------
+def load_cabin_index():
+    index = CabinIndex()
+    index.load(cabin_collection.find({}, {"ID": 1, "Bit": 1}))
+    return index
+
+
+def current_cabin_index():
+    return lookup_cache.cabin_index if lookup_cache.loaded else load_cabin_index()
+
+
+def reconcile_cabin_bits(query=None, index=None):
+    """
+    Rewrite Cabin_Bits wherever it is missing or disagrees with the Cabins array, which
+    stays authoritative: app.js, the mongo shell or an old user document only know Cabins.
+    Each write is conditional on Cabins being unchanged, so it cannot undo a concurrent grant.
+    """
+    index = index or current_cabin_index()
+    ops = []
+    for u in collection.find(query or {}, {"Cabins": 1, "Cabin_Bits": 1}):
+        bitmap = index.bitmap_for(u.get("Cabins"))
+        if "Cabin_Bits" in u and decode_bits(u["Cabin_Bits"]) == bitmap:
+            continue
+        unchanged = {"_id": u["_id"], "Cabins": u["Cabins"] if "Cabins" in u else {"$exists": False}}
+        ops.append(pymongo.UpdateOne(unchanged, {"$set": {"Cabin_Bits": encode_bits(bitmap)}}))
+    if ops:
+        collection.bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def recompute_cabin_bits(cabin_ids):
+    """
+    Re-derive Cabin_Bits for users listing any of cabin_ids, after a cabin was created,
+    renamed or deleted and its ID now maps to a different bit (or none).
+    """
+    cabin_ids = [c for c in cabin_ids if c]
+    if not cabin_ids:
+        return 0
+    query = {"Cabins": {"$in": cabin_ids}}
+    changed = reconcile_cabin_bits(query, load_cabin_index())
+    if changed:
+        notify_users_changed(query)
+    return changed
+
+
+# ---------- LOOKUP CACHE ----------
+class LookupCache:
+    """
+    In-process copy of the users/cabins lookup data and today's presence state.
+    users_by_rfid: RFID -> list of user docs (RFID is indexed, not unique)
+    bits_by_id: user _id -> bitmap of allowed cabins (see permissions.py)
+    cabins_by_id: cabin "ID" -> cabin doc
+    presence: RFID -> last log of the day {"IN/OUT", "time", "Log_Cabin"}
+
+    Invalidations that arrive while load() is reading its snapshot are queued and
+    replayed once the snapshot is in place, so a write made meanwhile is not lost.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loading = False
+        self._pending = []
+        self.loaded = False
+        self.users_by_id = {}
+        self.users_by_rfid = defaultdict(list)
+        self.bits_by_id = {}
+        self.cabins_by_id = {}
+        self.cabin_index = CabinIndex()
+        self.presence = {}
+        self.presence_date = ""
+
+    def load(self):
+        """Read a full snapshot and swap it in (warm-up and the periodic resync)."""
+        with self._load_lock:
+            with self._lock:
+                self._loading = True
+                self._pending = []
+            try:
+                users = list(collection.find({}))
+                cabins = list(cabin_collection.find({}))
+                today = datetime.now().strftime("%Y-%m-%d")
+                todays_logs = logs_collection.find(
+                    {"date": today},
+                    {"_id": 0, "RFID": 1, "IN/OUT": 1, "time": 1, "Log_Cabin": 1}
+                ).sort("time", pymongo.ASCENDING)
+
+                presence = {}
+                for log in todays_logs:
+                    presence[log.get("RFID", "")] = log
+            except Exception:
+                with self._lock:
+                    self._loading = False
+                    self._pending = []
+                raise
+
+            with self._lock:
+                self.cabins_by_id = {c.get("ID"): c for c in cabins}
+                self.cabin_index.load(cabins)
+                self.users_by_id = {}
+                self.users_by_rfid = defaultdict(list)
+                self.bits_by_id = {}
+                for user in users:
+                    self._add_user(user)
+                if self.presence_date == today:
+                    # Taps recorded after the logs were read are newer than the snapshot
+                    for rfid, entry in self.presence.items():
+                        if entry.get("time", "") > presence.get(rfid, {}).get("time", ""):
+                            presence[rfid] = entry
+                self.presence = presence
+                self.presence_date = today
+                self.loaded = True
+                self._loading = False
+                pending, self._pending = self._pending, []
+
+            for kind, arg in pending:
+                if kind == "user":
+                    self.refresh_user(arg)
+                elif kind == "users":
+                    self.refresh_users(arg)
+                else:
+                    self.refresh_cabins()
+
+    def _live(self, kind, arg=None):
+        """True when refreshes apply now; also queues the refresh if a load is in flight."""
+        with self._lock:
+            if self._loading:
+                self._pending.append((kind, arg))
+            return self.loaded
+
+    def _add_user(self, user):
+        self.users_by_id[user["_id"]] = user
+        self.users_by_rfid[user.get("RFID")].append(user)
+        if "Cabin_Bits" in user:
+            self.bits_by_id[user["_id"]] = decode_bits(user["Cabin_Bits"])
+        else:
+            self.bits_by_id[user["_id"]] = self.cabin_index.bitmap_for(user.get("Cabins"))
+
+    def _remove_user(self, oid):
+        self.bits_by_id.pop(oid, None)
+        old = self.users_by_id.pop(oid, None)
+        if old is not None:
+            docs = self.users_by_rfid.get(old.get("RFID"), [])
+            docs[:] = [d for d in docs if d["_id"] != oid]
+
+    def refresh_user(self, oid):
+        """Re-read a single user after it was inserted/updated/deleted."""
+        if not self._live("user", oid):
+            return
+        user = collection.find_one({"_id": oid})
+        with self._lock:
+            self._remove_user(oid)
+            if user:
+                self._add_user(user)
+
+    def refresh_users(self, query):
+        """Re-read every user matching query, e.g. after a bulk permission change."""
+        if not self._live("users", query):
+            return
+        users = list(collection.find(query))
+        with self._lock:
+            for user in users:
+                self._remove_user(user["_id"])
+                self._add_user(user)
+
+    def refresh_cabins(self):
+        if not self._live("cabins"):
+            return
+        cabins = list(cabin_collection.find({}))
+        with self._lock:
+            self.cabins_by_id = {c.get("ID"): c for c in cabins}
+            self.cabin_index.load(cabins)
+
+    def find_user(self, rfid, cabin_id):
+        """
+        Same match as the {"RFID", "$or": [Cabins, Log_Cabin]} query.
+        Returns (copy of the user, "Cabins" or "Log_Cabin"), or (None, None).
+        """
+        with self._lock:
+            for user in self.users_by_rfid.get(rfid, []):
+                if self.cabin_index.allows(self.bits_by_id[user["_id"]], cabin_id):
+                    return dict(user), "Cabins"
+                if user.get("Log_Cabin") == cabin_id:
+                    return dict(user), "Log_Cabin"
+        return None, None
+
+    def record_presence(self, log):
+        with self._lock:
+            if log.get("date") != self.presence_date:
+                self.presence = {}
+                self.presence_date = log.get("date", "")
+            self.presence[log.get("RFID", "")] = {
+                "RFID": log.get("RFID", ""),
+                "IN/OUT": log.get("IN/OUT", ""),
+                "time": log.get("time", ""),
+                "Log_Cabin": log.get("Log_Cabin", "")
+            }
+
+
+lookup_cache = LookupCache()
+
+
+class ReportCache:
+    """
+    Per-process cache of /logs summaries keyed by the query parameters.
+    Entries for a date are dropped whenever a log for that date is written (locally
+    or by another worker); undated queries are dropped on every log write.
+    """
+
+    def __init__(self, ttl=REPORT_CACHE_TTL, max_entries=REPORT_CACHE_SIZE):
+        self._lock = threading.Lock()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = {}
+        self.generation = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            stored_at, summary = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self.entries[key]
+                return None
+            return summary
+
+    def put(self, key, summary, generation):
+        """generation: value of self.generation when the report was started; stale results are dropped."""
+        with self._lock:
+            if generation != self.generation:
+                return
+            if len(self.entries) >= self.max_entries:
+                del self.entries[next(iter(self.entries))]
+            self.entries[key] = (time.monotonic(), summary)
+
+    def invalidate_date(self, date):
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self.entries if k[2] in (date, None)]:
+                del self.entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self.entries = {}
+
+
+report_cache = ReportCache()
+
+
+# ---------- CROSS-WORKER INVALIDATION ----------
+invalidation_bus = None
+
+
+def apply_invalidation(message):
+    """Handle a message published by another worker."""
+    kind = message.get("kind")
+    if kind == "user":
+        lookup_cache.refresh_user(ObjectId(message["id"]))
+    elif kind == "users":
+        # Bulk change; the query is not sent (an RFID list can outgrow a datagram)
+        lookup_cache.refresh_users({})
+    elif kind == "cabins":
+        lookup_cache.refresh_cabins()
+    elif kind == "log":
+        lookup_cache.record_presence(message["log"])
+        report_cache.invalidate_date(message["log"].get("date"))
+
+
+def publish_invalidation(message):
+    if invalidation_bus is not None:
+        invalidation_bus.publish(message)
+
+
+def notify_user_changed(oid):
+    lookup_cache.refresh_user(oid)
+    publish_invalidation({"kind": "user", "id": str(oid)})
+
+
+def notify_users_changed(query):
+    lookup_cache.refresh_users(query)
+    publish_invalidation({"kind": "users"})
+
+
+def notify_cabins_changed():
+    lookup_cache.refresh_cabins()
+    publish_invalidation({"kind": "cabins"})
+
+
+def notify_log_written(log):
+    entry = {k: log.get(k, "") for k in ("RFID", "IN/OUT", "date", "time", "Log_Cabin")}
+    lookup_cache.record_presence(entry)
+    report_cache.invalidate_date(entry["date"])
+    publish_invalidation({"kind": "log", "log": entry})
 
 
+# ---------- ADMISSION CONTROL ----------
+admission = AdmissionController(ADMISSION_LIMITS)
 
 
+@bp.before_request
+def admit_request():
+    if request.endpoint in UNSCHEDULED_ROUTES or request.method == "OPTIONS":
+        return None
+    route_class = ROUTE_CLASSES.get(request.endpoint, "admin")
+    try:
+        admission.acquire(route_class)
+    except Overloaded as e:
+        response = jsonify({"status": "error", "message": "Server busy, retry later"})
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response, 429
+    g.route_class = route_class
+    return None
+
+
+@bp.teardown_request
+def release_request(exc):
+    route_class = g.pop("route_class", None)
+    if route_class is not None:
+        admission.release(route_class)
+
+
+# ---------- PROFILING ----------
+sampling_profiler = SamplingProfiler(PROFILE_DIR)
+request_profiler = RequestProfiler(PROFILE_DIR)
+
+
+def profiling_authorized():
+    if not PROFILING_ENABLED:
+        return False
+    return not PROFILE_TOKEN or hmac.compare_digest(request.headers.get("X-Profile-Token", ""), PROFILE_TOKEN)
+
+
+@bp.before_request
+def start_request_profile():
+    # Per-request cProfile capture: send "X-Profile: 1"
+    if request.headers.get("X-Profile") == "1" and profiling_authorized():
+        profile = request_profiler.begin()
+        if profile is not None:
+            g.profile = profile
+
+
+@bp.after_request
+def finish_request_profile(response):
+    profile = g.pop("profile", None)
+    if profile is not None:
+        path = request_profiler.end(profile, request.endpoint or "unknown")
+        response.headers["X-Profile-File"] = os.path.basename(path)
+    return response
+
+
+@bp.teardown_request
+def drop_request_profile(exc):
+    # after_request is skipped when the view raised
+    profile = g.pop("profile", None)
+    if profile is not None:
+        request_profiler.end(profile, request.endpoint or "unknown")
+
+
+@bp.route('/debug/profile', methods=['POST'])
+def start_profile():
+    if not profiling_authorized():
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    data = request.get_json(silent=True)
+    if data is None:
+        data = {}
+    elif not isinstance(data, dict):
+        return jsonify({"status": "error", "message": "Body must be a JSON object"}), 400
+    interval_ms = data.get("interval_ms")
+    try:
+        seconds = positive_number(data.get("seconds", 10), "seconds")
+        interval = None if interval_ms is None else positive_number(interval_ms, "interval_ms") / 1000
+        path = sampling_profiler.start(seconds, interval)
+    except ValueError as e:
+        return jsonify({"status": "error", "message": str(e)}), 400
+    except RuntimeError as e:
+        return jsonify({"status": "error", "message": str(e)}), 409
+    return jsonify({"status": "started", "file": os.path.basename(path)}), 202
+
 
+@bp.route('/debug/profile', methods=['GET'])
+def profile_status():
+    if not profiling_authorized():
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    status = sampling_profiler.status()
+    for key in ("running", "last"):
+        if status[key]:
+            status[key] = dict(status[key], file=os.path.basename(status[key]["file"]))
+    return jsonify(status), 200
 
 
+@bp.route('/debug/profile/<name>', methods=['GET'])
+def download_profile(name):
+    if not profiling_authorized():
+        return jsonify({"status": "error", "message": "Not found"}), 404
+    return send_from_directory(PROFILE_DIR, name, as_attachment=True)
+
+
+def _profile_on_signal(signum, frame):
+    try:
+        sampling_profiler.start(PROFILE_SIGNAL_SECONDS)
+    except (RuntimeError, ValueError):
+        # Already capturing, or a bad PROFILE_SIGNAL_SECONDS; never raise into the interrupted thread
+        pass
+
+
+# ---------- STARTUP / READINESS ----------
+startup_state = {
+    "ready": False,
+    "warmup_error": None,
+    "time_to_ready": None,       # seconds from PROCESS_START to warm-up done
+    "time_to_first_tap": None,   # seconds from PROCESS_START to first served /api/submit
+    "warmup_steps": {}
+}
+
+
+def warm_up(app, retry_interval=5):
+    """Open the pool, ensure indexes and preload lookups before /ready turns green."""
+    while True:
+        steps = {}
+        try:
+            t = time.monotonic()
+            get_client().admin.command("ping")
+            get_client("batch").admin.command("ping")
+            steps["connect"] = round(time.monotonic() - t, 4)
+
+            t = time.monotonic()
+            ensure_indexes()
+            steps["indexes"] = round(time.monotonic() - t, 4)
+
+            t = time.monotonic()
+            assign_cabin_bits(cabin_collection, counters_collection)
+            reconcile_cabin_bits(index=load_cabin_index())
+            steps["cabin_bits"] = round(time.monotonic() - t, 4)
+
+            t = time.monotonic()
+            lookup_cache.load()
+            steps["preload"] = round(time.monotonic() - t, 4)
+            break
+        except Exception as e:
+            startup_state["warmup_error"] = str(e)
+            app.logger.warning("Warm-up failed, retrying in %ss: %s", retry_interval, e)
+            time.sleep(retry_interval)
+
+    startup_state["warmup_steps"] = steps
+    startup_state["warmup_error"] = None
+    startup_state["time_to_ready"] = round(time.monotonic() - PROCESS_START, 4)
+    startup_state["ready"] = True
+    app.logger.info("Ready in %ss (steps: %s)", startup_state["time_to_ready"], steps)
+
+    if LOOKUP_RESYNC_SECONDS > 0:
+        threading.Thread(target=resync_lookups, args=(app,), daemon=True).start()
+
+
+def resync_lookups(app, interval=LOOKUP_RESYNC_SECONDS):
+    """Periodically re-read the lookup cache; taps are answered from it, so this bounds staleness."""
+    while True:
+        time.sleep(interval)
+        try:
+            # Cabins edited outside this app leave Cabin_Bits behind until reconciled
+            reconcile_cabin_bits(index=load_cabin_index())
+            lookup_cache.load()
+        except Exception as e:
+            app.logger.warning("Lookup resync failed, keeping the previous snapshot: %s", e)
+
+
+@bp.after_request
+def mark_first_tap(response):
+    # Any tap the view answered counts (unknown cards get 404), not only successful ones;
+    # g.route_class is only set once admission let the request through, so 429s are skipped
+    if (request.endpoint == "transactions.api_submit" and g.get("route_class")
+            and startup_state["time_to_first_tap"] is None):
+        startup_state["time_to_first_tap"] = round(time.monotonic() - PROCESS_START, 4)
+        current_app.logger.info("First tap served %ss after process start (status %s)",
+                                startup_state["time_to_first_tap"], response.status_code)
+    return response
+
+
+@bp.route('/health', methods=['GET'])
+def health():
+    return jsonify({"status": "ok"}), 200
+
+
+@bp.route('/ready', methods=['GET'])
+def ready():
+    body = {
+        "status": "ready" if startup_state["ready"] else "starting",
+        "time_to_ready": startup_state["time_to_ready"],
+        "time_to_first_tap": startup_state["time_to_first_tap"],
+        "warmup_steps": startup_state["warmup_steps"],
+        "warmup_error": startup_state["warmup_error"],
+        "admission": admission.stats(),
+        "invalidations_dropped": invalidation_bus.dropped if invalidation_bus is not None else 0
+    }
+    return jsonify(body), 200 if startup_state["ready"] else 503
+
+
+# Normalize query inputs to lists
+def to_list(x):
+    if x is None:
+        return []
+    if isinstance(x, list):
+        return x
+    if isinstance(x, str) and "," in x:
+        return [i.strip() for i in x.split(",") if i.strip()]
+    return [x]
+
 
 def process_all_logs(logs, result_container, query_name=None, query_rfid=None, query_date=None, query_cabin_id=None):
     """
@@ -258,16 +630,6 @@ def process_all_logs(logs, result_container, query_name=None, query_rfid=None, q
     query_date: str date (from query)
     """
 
-    # Normalize query inputs to lists
-    def to_list(x):
-        if x is None:
-            return []
-        if isinstance(x, list):
-            return x
-        if isinstance(x, str) and "," in x:
-            return [i.strip() for i in x.split(",") if i.strip()]
-        return [x]
-
     q_names = to_list(query_name)
     q_rfids = to_list(query_rfid)
     q_cabin_id = to_list(query_cabin_id)
@@ -418,7 +780,13 @@ def process_all_logs(logs, result_container, query_name=None, query_rfid=None, q
             "errors": errors if errors else "Absent"
         })
 
-    # --- Add Absent rows for requested names/rfids that weren't present in DB result --- #
+    append_absent_rows(summaries, q_names, q_rfids, q_date, present_pairs, present_names, present_rfids)
+
+    result_container["summary"] = summaries
+
+
+def append_absent_rows(summaries, q_names, q_rfids, q_date, present_pairs, present_names, present_rfids):
+    """Add Absent rows for requested names/rfids that have no logs in the result."""
     # Pairwise when lengths match
     if q_names and q_rfids and len(q_names) == len(q_rfids):
         for n, r in zip(q_names, q_rfids):
@@ -467,36 +835,55 @@ def process_all_logs(logs, result_container, query_name=None, query_rfid=None, q
                     "errors": "Absent"
                 })
 
-    result_container["summary"] = summaries
-
-
-
-
-
-
 
+def summarize_logs_pipeline(query, result_container, query_name=None, query_rfid=None, query_date=None, query_cabin_id=None):
+    """
+    Same output as process_all_logs, but the per-person summaries are computed by
+    a MongoDB aggregation so only summary rows cross the network.
+    """
+    rows = list(batch_logs_collection.aggregate(build_summary_pipeline(query), allowDiskUse=True))
+    if not rows:
+        # Absent-only answer; identical to the Python path
+        return process_all_logs([], result_container, query_name, query_rfid, query_date, query_cabin_id)
 
+    q_names = to_list(query_name)
+    q_rfids = to_list(query_rfid)
+    q_date = query_date if query_date else ""
 
+    summaries = [format_summary_row(row) for row in rows]
+    present_pairs = {(s["name"], s["rfid"]) for s in summaries}
+    present_names = {s["name"] for s in summaries}
+    present_rfids = {s["rfid"] for s in summaries}
+    append_absent_rows(summaries, q_names, q_rfids, q_date, present_pairs, present_names, present_rfids)
 
+    result_container["summary"] = summaries
 
 
-@app.route('/submit', methods=['POST'])
+@bp.route('/submit', methods=['POST'])
 def submit():
     data = request.get_json()
     if not data:
         return jsonify({"status": "error", "message": "No data received"}), 400
     
-    collection.insert_one(data)
+    data["Cabin_Bits"] = encode_bits(current_cabin_index().bitmap_for(data.get("Cabins")))
+    result = collection.insert_one(data)
+    notify_user_changed(result.inserted_id)
     return jsonify({"status": "success", "message": "Data saved"}), 201
 
 
-@app.route('/add_cabin', methods=['POST'])
+@bp.route('/add_cabin', methods=['POST'])
 def add_cabin():
     data = request.get_json()
     if not data:
         return jsonify({"status": "error", "message": "No data received"}), 400
     
+    # Bits are only handed out by assign_cabin_bits; a client-chosen one could alias another cabin
+    data.pop("Bit", None)
     cabin_collection.insert_one(data)
+    assign_cabin_bits(cabin_collection, counters_collection)
+    notify_cabins_changed()
+    # Users created before this cabin (or holding a deleted cabin of the same ID) get its new bit
+    recompute_cabin_bits([data.get("ID")])
     return jsonify({"status": "success", "message": "Data saved"}), 201
 
 
@@ -504,9 +891,9 @@ def add_cabin():
 
 
 # ---------- READ ----------
-@app.route('/list', methods=['GET'])
+@bp.route('/list', methods=['GET'])
 def get_list():
-    docs = list(collection.find(
+    docs = list(batch_users_collection.find(
         {},
         {
             "_id": 1,
@@ -525,7 +912,7 @@ def get_list():
 
     
 
-@app.route('/list_cabin', methods=['GET'])
+@bp.route('/list_cabin', methods=['GET'])
 def get_cabin_list():
     docs = list(cabin_collection.find({}, {"ID": 1, "Building": 1, "Floor": 1, "Door": 1}))
     # convert ObjectId to string
@@ -535,7 +922,7 @@ def get_cabin_list():
 
 
 
-@app.route('/update_cabin/<id>', methods=['PUT', 'OPTIONS'])
+@bp.route('/update_cabin/<id>', methods=['PUT', 'OPTIONS'])
 def update_cabin(id):
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
@@ -544,6 +931,11 @@ def update_cabin(id):
     if not data:
         return jsonify({"status": "error", "message": "No data received"}), 400
     
+    old = cabin_collection.find_one({"_id": ObjectId(id)}, {"ID": 1})
+    if not old:
+        return jsonify({"status": "error", "message": "Record not found"}), 404
+
+    # Only these fields are writable; Bit stays as assign_cabin_bits set it
     result = cabin_collection.update_one(
         {"_id": ObjectId(id)},
         {"$set": {
@@ -554,17 +946,24 @@ def update_cabin(id):
         }}
     )
     if result.modified_count > 0:
+        notify_cabins_changed()
+        # The Bit stays with the cabin document, so a rename would otherwise move access
+        # to whoever holds the bit; re-derive it from each user's Cabins array instead
+        if old.get("ID") != data.get("ID"):
+            recompute_cabin_bits([old.get("ID"), data.get("ID")])
         return jsonify({"status": "success", "message": "Record updated"})
     return jsonify({"status": "error", "message": "Record not found"}), 404
 
 
-@app.route('/delete_cabin/<id>', methods=['DELETE', 'OPTIONS'])
+@bp.route('/delete_cabin/<id>', methods=['DELETE', 'OPTIONS'])
 def delete_cabin(id):
     if request.method == 'OPTIONS':
         return jsonify({'status': 'ok'}), 200
     
-    result = cabin_collection.delete_one({"_id": ObjectId(id)})
-    if result.deleted_count > 0:
+    old = cabin_collection.find_one_and_delete({"_id": ObjectId(id)}, {"ID": 1})
+    if old:
+        notify_cabins_changed()
+        recompute_cabin_bits([old.get("ID")])
         return jsonify({"status": "success", "message": "Record deleted"})
     return jsonify({"status": "error", "message": "Record not found"}), 404
 
@@ -578,7 +977,7 @@ def delete_cabin(id):
 
 
 # ---------- UPDATE ----------
-@app.route('/update/<id>', methods=['PUT'])
+@bp.route('/update/<id>', methods=['PUT'])
 def update_employee(id):
     try:
         print("🟡 Update endpoint hit with ID:", id)
@@ -605,11 +1004,16 @@ def update_employee(id):
 
         if "_id" in data:
             del data["_id"]
+        # Keep the permission bitmap in step with the Cabins array
+        data.pop("Cabin_Bits", None)
+        if "Cabins" in data:
+            data["Cabin_Bits"] = encode_bits(current_cabin_index().bitmap_for(data["Cabins"]))
 
         # ✅ Perform true update (no upsert)
         result = collection.update_one({"_id": oid}, {"$set": data}, upsert=False)
 
         print(f"Matched: {result.matched_count}, Modified: {result.modified_count}")
+        notify_user_changed(oid)
 
         if result.modified_count == 0:
             return jsonify({"status": "warning", "message": "No changes made"}), 200
@@ -626,28 +1030,105 @@ def update_employee(id):
 
 
 # ---------- DELETE ----------
-@app.route('/delete/<id>', methods=['DELETE'])
+@bp.route('/delete/<id>', methods=['DELETE'])
 def delete(id):
     result = collection.delete_one({"_id": ObjectId(id)})
     if result.deleted_count > 0:
+        notify_user_changed(ObjectId(id))
         return jsonify({"status": "success", "message": "Record deleted"})
     return jsonify({"status": "error", "message": "Record not found"}), 404
 
+# ---------- PERMISSIONS ----------
+CABIN_SELECTORS = ("ID", "Building", "Floor", "Door")
+
+
+def bulk_cabin_permissions(action):
+    """
+    Grant or revoke a set of cabins for many users with one update_many.
+    Body: any of "ID", "Building", "Floor", "Door" (value or list) to select cabins,
+    and either a non-empty "RFIDs" list or "all": true to select users.
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({"status": "error", "message": "No data received"}), 400
+
+    rfids = to_list(data.get("RFIDs"))
+    if rfids:
+        user_query = {"RFID": {"$in": rfids}}
+    elif data.get("all") is True:
+        user_query = {}
+    else:
+        return jsonify({"status": "error", "message": 'Select users with "RFIDs" or "all": true'}), 400
+
+    cabin_query = {f: {"$in": to_list(data[f])} for f in CABIN_SELECTORS if data.get(f)}
+    if not cabin_query:
+        return jsonify({"status": "error", "message": "Select cabins by ID, Building, Floor or Door"}), 400
+
+    assign_cabin_bits(cabin_collection, counters_collection)
+    cabins = list(cabin_collection.find(cabin_query, {"ID": 1, "Bit": 1}))
+    if not cabins:
+        return jsonify({"status": "error", "message": "No cabins match"}), 404
+    cabin_ids = [c.get("ID") for c in cabins]
+    bitmap = 0
+    for c in cabins:
+        bitmap |= 1 << c["Bit"]
+
+    # $bit works on the stored words, so they must match Cabins first; a missing Cabin_Bits
+    # would otherwise start from zero and drop the user's existing cabins
+    reconcile_cabin_bits(user_query, load_cabin_index())
+
+    if action == "grant":
+        update = {"$addToSet": {"Cabins": {"$each": cabin_ids}}, "$bit": bit_update(bitmap, "or")}
+    else:
+        update = {"$pull": {"Cabins": {"$in": cabin_ids}}, "$bit": bit_update(bitmap, "and")}
+    result = collection.update_many(user_query, update)
+    notify_users_changed(user_query)
+
+    return jsonify({
+        "status": "success",
+        "message": f"{'Granted' if action == 'grant' else 'Revoked'} {len(cabin_ids)} cabins",
+        "cabins": cabin_ids,
+        "matched": result.matched_count,
+        "modified": result.modified_count
+    }), 200
+
+
+@bp.route('/permissions/grant', methods=['POST'])
+def grant_cabins():
+    return bulk_cabin_permissions("grant")
+
+
+@bp.route('/permissions/revoke', methods=['POST'])
+def revoke_cabins():
+    return bulk_cabin_permissions("revoke")
+
+
+@bp.route('/permissions/check', methods=['GET'])
+def check_permission():
+    rfid = request.args.get("rfid")
+    cabin_id = request.args.get("cabin")
+    if not rfid or not cabin_id:
+        return jsonify({"status": "error", "message": "rfid and cabin are required"}), 400
+
+    if lookup_cache.loaded:
+        user, _ = lookup_cache.find_user(rfid, cabin_id)
+    else:
+        user = collection.find_one({"RFID": rfid, "$or": [{"Cabins": cabin_id}, {"Log_Cabin": cabin_id}]})
+    return jsonify({"rfid": rfid, "cabin": cabin_id, "allowed": user is not None}), 200
+
+
 # ---------- LOGS ----------
 def create_log(data):
-    logs_collection = db["logs"]
-
     if "_id" in data:
         del data["_id"]   # avoid duplicate IDs
     data["_id"] = ObjectId()
 
     result = logs_collection.insert_one(data)
     print("Inserted document ID:", result.inserted_id)
+    notify_log_written(data)
 
-@app.route("/logs", methods=["GET"])
+@bp.route("/logs", methods=["GET"])
 def view_logs():
-    logs_collection = db["logs"]
-
     # --- Read query parameters ---
     names = request.args.getlist("name")   # multiple ?name=Alice&name=Bob
     rfids = request.args.getlist("rfid")   # optional ?rfid=...
@@ -655,7 +1136,7 @@ def view_logs():
     cabin_id = request.args.get("log_cabin")      # e.g. "2025-09-08"
 
     # --- Debug: log what we received (temporary) ---
-    app.logger.debug("QUERY params - names: %s, rfids: %s, date: %s, cabin_id: %s", names, rfids, date, cabin_id)
+    current_app.logger.debug("QUERY params - names: %s, rfids: %s, date: %s, cabin_id: %s", names, rfids, date, cabin_id)
 
     # --- Build filter dynamically ---
     query = {}
@@ -668,22 +1149,50 @@ def view_logs():
     if cabin_id:
         query["Log_Cabin"] = cabin_id
 
-    app.logger.debug("Mongo query: %s", query)
+    current_app.logger.debug("Mongo query: %s", query)
 
-    # --- Fetch filtered logs ---
-    logs = list(logs_collection.find(query, {"_id": 0}))
-    app.logger.debug("Found %d logs", len(logs))
-    if logs:
-        app.logger.debug("Sample log: %s", logs[0])
+    # The engines order rows differently (pipeline sorts, Python keeps first-seen order),
+    # so each engine gets its own entry. The date must stay at index 2 for invalidate_date.
+    engine = request.args.get("engine", LOGS_ENGINE)
+    if engine not in LOGS_ENGINES:
+        # Also keeps arbitrary values from filling the report cache
+        return jsonify({"status": "error", "message": "engine must be one of: " + ", ".join(LOGS_ENGINES)}), 400
+    cache_key = (tuple(names), tuple(rfids), date or None, cabin_id or None, engine)
+    cached = report_cache.get(cache_key)
+    if cached is not None:
+        return jsonify(cached)
+    generation = report_cache.generation
 
-    # --- Process logs with your function (pass original query params) ---
     result_container = {}
-    thread = threading.Thread(
-        target=process_all_logs,
-        args=(logs, result_container, names or None, rfids or None, date or None, cabin_id or None)
-    )
-    thread.start()
-    thread.join()
+    if engine == "pipeline":
+        try:
+            summarize_logs_pipeline(query, result_container, names or None, rfids or None, date or None, cabin_id or None)
+        except pymongo.errors.PyMongoError as e:
+            # e.g. server too old for $reduce/$dateFromString: fall back to the Python path
+            current_app.logger.warning("Pipeline engine failed, using Python summaries: %s", e)
+            result_container = {}
+
+    if "summary" not in result_container:
+        # --- Fetch filtered logs, pausing between batches while taps are pending ---
+        logs = []
+        for log in batch_logs_collection.find(query, {"_id": 0}).batch_size(REPORT_BATCH_SIZE):
+            logs.append(log)
+            if len(logs) % REPORT_BATCH_SIZE == 0:
+                admission.yield_to_realtime()
+        current_app.logger.debug("Found %d logs", len(logs))
+        if logs:
+            current_app.logger.debug("Sample log: %s", logs[0])
+
+        # --- Process logs with your function (pass original query params) ---
+        thread = threading.Thread(
+            target=process_all_logs,
+            args=(logs, result_container, names or None, rfids or None, date or None, cabin_id or None)
+        )
+        thread.start()
+        thread.join()
+
+    if "summary" in result_container:
+        report_cache.put(cache_key, result_container["summary"], generation)
 
     # Always return the summary (guaranteed by process_all_logs)
     return jsonify(result_container.get("summary", [{
@@ -700,30 +1209,28 @@ def view_logs():
     }]))
 
 # ---- SIMPLE API ENDPOINT (Accept & Return Success) ----
-@app.route('/api/submit', methods=['POST'])
+@bp.route('/api/submit', methods=['POST'])
 def api_submit():
-    global priority_active
-    priority_active.set()
     with lock:
-        try:
-            if not request.is_json:
-                return jsonify({"status": "error", "message": "Content-Type must be application/json"}), 400
+        if not request.is_json:
+            return jsonify({"status": "error", "message": "Content-Type must be application/json"}), 400
         
-            data = request.get_json(silent=True)
-            print(data)
-            if not data:
-                return jsonify({"status": "error", "message": "Invalid or empty JSON"}), 400
+        data = request.get_json(silent=True)
+        print(data)
+        if not data:
+            return jsonify({"status": "error", "message": "Invalid or empty JSON"}), 400
         
-            rfid = data.get("RFID")
-            id = data.get("ID")
-            if not rfid:
-                return jsonify({"status": "error", "message": "Missing RFID field"}), 400
-            if not id:
-                return jsonify({"status": "error", "message": "Missing ID field"}), 400
+        rfid = data.get("RFID")
+        id = data.get("ID")
+        if not rfid:
+            return jsonify({"status": "error", "message": "Missing RFID field"}), 400
+        if not id:
+            return jsonify({"status": "error", "message": "Missing ID field"}), 400
         
-            # Ensure index for fast lookup
-            collection.create_index("RFID")
-            #result = collection.find_one({"RFID": rfid, "Cabin": id})
+        # Indexes are ensured during warm-up; serve from the preloaded lookup when ready
+        if lookup_cache.loaded:
+            rfid_exists, location = lookup_cache.find_user(rfid, id)
+        else:
             rfid_exists = collection.find_one({
             "RFID": rfid,
             "$or": [
@@ -731,45 +1238,65 @@ def api_submit():
                 {"Log_Cabin": id}
                ]
             })
-            if rfid_exists:
-                print("rfid_exists", rfid_exists)
-                if id in rfid_exists.get("Cabins", []):
-                    print("✅ ID found in Cabins")
-                    location="Cabins"
-                elif rfid_exists.get("Log_Cabin") == id:
-                    print("✅ ID found in Log_Cabin")
-                    location="Log_Cabin"
-                else:
-                    print("⚠️ ID not found in either field")
-            else:
-                print("❌ No document found for this RFID and ID")
-                location="None"
+            # The $or guarantees one of the two matched
+            location = "Cabins" if rfid_exists and id in rfid_exists.get("Cabins", []) else "Log_Cabin"
+        if rfid_exists:
+            print("rfid_exists", rfid_exists)
+            print(f"✅ ID found in {location}")
+        else:
+            print("❌ No document found for this RFID and ID")
+            location="None"
         
-            if location=="Log_Cabin":
-                merged_dict={**data, **rfid_exists}
-                #print("merged_dict before date and time", merged_dict)
-                now_time_date = datetime.now()
-                merged_dict["date"] = now_time_date.strftime("%Y-%m-%d")   # e.g. "2025-08-28"
-                merged_dict["time"] = now_time_date.strftime("%H:%M:%S")   # e.g. "10:45:33"
-                #print("merged_dict", merged_dict)
-                thread = threading.Thread(target=create_log, args=(merged_dict,))    #creats background jobs to creat logs
-                thread.start()
-                #create_log(merged_dict)
+        if location=="Log_Cabin":
+            merged_dict={**data, **rfid_exists}
+            merged_dict.pop("Cabin_Bits", None)   # permission bitmap, not part of a log
+            #print("merged_dict before date and time", merged_dict)
+            now_time_date = datetime.now()
+            merged_dict["date"] = now_time_date.strftime("%Y-%m-%d")   # e.g. "2025-08-28"
+            merged_dict["time"] = now_time_date.strftime("%H:%M:%S")   # e.g. "10:45:33"
+            #print("merged_dict", merged_dict)
+            thread = threading.Thread(target=create_log, args=(merged_dict,))    #creats background jobs to creat logs
+            thread.start()
+            #create_log(merged_dict)
         
-            if not rfid_exists:
-                return jsonify({
-                    "status": "error",
-                    "message": f"No data found for RFID {rfid}"
-                }), 404   # Not Found
+        if not rfid_exists:
+            return jsonify({
+                "status": "error",
+                "message": f"No data found for RFID {rfid}"
+            }), 404   # Not Found
         
-            # Convert ObjectId to string for JSON
-            rfid_exists["_id"] = str(rfid_exists["_id"])
+        # Convert ObjectId to string for JSON
+        rfid_exists["_id"] = str(rfid_exists["_id"])
         
-            return jsonify({
-                "status": "success",
-            }), 200
-        finally:
-            priority_active.clear()
+        return jsonify({
+            "status": "success",
+        }), 200
+
+
+def create_app(warm=True):
+    """
+    Application factory. Nothing touches MongoDB until warm-up (or the first request) runs.
+    warm: start the warm-up thread; /ready returns 503 until it finishes
+    """
+    app = Flask(__name__)
+    CORS(app)  # <-- allow all origins
+    app.register_blueprint(bp)
+
+    global invalidation_bus
+    if INVALIDATION_DIR and invalidation_bus is None:
+        invalidation_bus = InvalidationBus(INVALIDATION_DIR, apply_invalidation, app.logger).start()
+
+    if PROFILING_ENABLED and hasattr(signal, "SIGUSR2") and threading.current_thread() is threading.main_thread():
+        # kill -USR2 <pid> records PROFILE_SIGNAL_SECONDS of stacks
+        signal.signal(signal.SIGUSR2, _profile_on_signal)
+
+    if warm:
+        threading.Thread(target=warm_up, args=(app,), daemon=True).start()
+    else:
+        startup_state["ready"] = True
+    return app
+
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000, debug=True)
+    app = create_app()
+    app.run(host='0.0.0.0', port=int(os.environ.get("PORT", "8000")), debug=FLASK_DEBUG, use_reloader=False)
@@ -0,0 +1,112 @@
+"""
+/logs engines compared: Python (process_all_logs over raw events) vs the
+MongoDB aggregation pipeline. Seeds one day for --employees people into a
+scratch database, checks both engines return the same summaries, then reports
+reply bytes received from the server and latency for each.
+
+    MONGO_URI=mongodb://localhost:27017/ python benchmarks/logs_pipeline_bench.py --employees 10000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import bson
+from pymongo import MongoClient, monitoring
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("MONGO_DB", "Transaction_project_bench")
+import app  # noqa: E402
+
+
+class ReplyBytes(monitoring.CommandListener):
+    def __init__(self):
+        self.total = 0
+
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        self.total += len(bson.encode(event.reply))
+
+    def failed(self, event):
+        pass
+
+
+def seed(coll, employees, date, rng):
+    coll.drop()
+    docs = []
+    for i in range(employees):
+        name, rfid = "emp%05d@example.com" % i, str(100000 + i)
+        t = 8 * 3600 + rng.randint(0, 3600)
+        actions = ["IN", "OUT"] * rng.randint(1, 4)
+        if rng.random() < 0.05:
+            actions.pop()                       # missing OUT
+        if rng.random() < 0.03:
+            actions.insert(1, "IN")             # duplicate IN
+        for action in actions:
+            t += rng.randint(60, 2 * 3600)
+            if t >= 24 * 3600:
+                break
+            docs.append({"Name": name, "RFID": rfid, "date": date, "Log_Cabin": "L1", "IN/OUT": action,
+                         "time": "%02d:%02d:%02d" % (t // 3600, t // 60 % 60, t % 60)})
+    coll.insert_many(docs)
+    app.ensure_indexes()
+    return len(docs)
+
+
+def key(row):
+    return (row["date"], row["name"], row["rfid"])
+
+
+def run(engine, query, date, listener):
+    result = {}
+    listener.total = 0
+    start = time.perf_counter()
+    if engine == "pipeline":
+        app.summarize_logs_pipeline(query, result, None, None, date, None)
+    else:
+        logs = list(app.batch_logs_collection.find(query, {"_id": 0}))
+        app.process_all_logs(logs, result, None, None, date, None)
+    # Row order differs by design (pipeline sorts, Python keeps first-seen order); the content
+    # and ordering rules are checked by tests/test_log_pipeline_parity.py
+    return sorted(result["summary"], key=key), time.perf_counter() - start, listener.total
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--employees", type=int, default=10000)
+    parser.add_argument("--date", default="2025-09-08")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    listener = ReplyBytes()
+    # One client for both pools so the listener sees every reply
+    app._clients["default"] = app._clients["batch"] = MongoClient(app.MONGO_URI, event_listeners=[listener])
+    n_events = seed(app.logs_collection, args.employees, args.date, random.Random(args.seed))
+    print("seeded %d events for %d employees into %s" % (n_events, args.employees, app.MONGO_DB))
+
+    query = {"date": args.date}
+    python_rows, _, _ = run("python", query, args.date, listener)
+    pipeline_rows, _, _ = run("pipeline", query, args.date, listener)
+    mismatches = [(a, b) for a, b in zip(python_rows, pipeline_rows) if a != b]
+    if len(python_rows) != len(pipeline_rows) or mismatches:
+        print("PARITY FAILED: %d vs %d rows, first mismatch: %r" % (
+            len(python_rows), len(pipeline_rows), mismatches[:1]))
+        sys.exit(1)
+    print("parity ok: %d summary rows" % len(python_rows))
+
+    for engine in ("python", "pipeline"):
+        times, received = [], 0
+        for _ in range(args.repeat):
+            _, elapsed, received = run(engine, query, args.date, listener)
+            times.append(elapsed)
+        times.sort()
+        print("%-8s median=%.1fms  min=%.1fms  bytes received=%d" % (
+            engine, times[len(times) // 2] * 1000, times[0] * 1000, received))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Cost of the profiling hooks on tap latency. Against a server started with
+PROFILING_ENABLED=1, measures /api/submit latency with profiling off, then
+while a sampling capture runs, and prints the sampler's self-measured
+overhead. Finally times a few taps captured with per-request cProfile.
+
+    PROFILING_ENABLED=1 python app.py &
+    python benchmarks/profiling_overhead_bench.py --rfid 123456789 --cabin C1
+"""
+import argparse
+import http.client
+import json
+import time
+from urllib.parse import urlparse
+
+
+def request(conn, method, path, body=None, headers=None):
+    headers = dict(headers or {})
+    if body is not None:
+        body = json.dumps(body)
+        headers["Content-Type"] = "application/json"
+    start = time.monotonic()
+    conn.request(method, path, body=body, headers=headers)
+    res = conn.getresponse()
+    data = res.read()
+    return time.monotonic() - start, res, data
+
+
+def taps(conn, rfid, cabin, duration, headers=None):
+    latencies = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        elapsed, _, _ = request(conn, "POST", "/api/submit", {"RFID": rfid, "ID": cabin, "IN/OUT": "IN"}, headers)
+        latencies.append(elapsed)
+    return sorted(latencies)
+
+
+def summary(latencies):
+    p = lambda q: latencies[max(0, int(len(latencies) * q) - 1)] * 1000
+    return "n=%d p50=%.2fms p99=%.2fms" % (len(latencies), p(0.5), p(0.99))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--rfid", required=True)
+    parser.add_argument("--cabin", required=True)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--interval-ms", type=float, default=5)
+    parser.add_argument("--token", default="")
+    args = parser.parse_args()
+
+    url = urlparse(args.base)
+    conn = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=30)
+    auth = {"X-Profile-Token": args.token} if args.token else {}
+
+    print("profiling off:     " + summary(taps(conn, args.rfid, args.cabin, args.duration)))
+
+    _, res, data = request(conn, "POST", "/debug/profile",
+                           {"seconds": args.duration + 1, "interval_ms": args.interval_ms}, auth)
+    if res.status != 202:
+        raise SystemExit("could not start sampler (%d): %s" % (res.status, data.decode()))
+    print("sampler running:   " + summary(taps(conn, args.rfid, args.cabin, args.duration)))
+    time.sleep(1.5)
+    _, _, data = request(conn, "GET", "/debug/profile", headers=auth)
+    last = json.loads(data)["last"]
+    print("sampler self-measured overhead: %.2f%% over %d samples (%s)" % (
+        last["overhead"] * 100, last["samples"], last["file"]))
+
+    profiled = []
+    for _ in range(5):
+        elapsed, res, _ = request(conn, "POST", "/api/submit", {"RFID": args.rfid, "ID": args.cabin, "IN/OUT": "IN"},
+                                  dict(auth, **{"X-Profile": "1"}))
+        if res.getheader("X-Profile-File"):
+            profiled.append(elapsed)
+    print("cProfile per-request: " + (summary(sorted(profiled)) if profiled else "no captures (rate limited)"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Startup benchmark: launches app.py, waits for /ready, sends one tap and reports
+time to ready and time to first served tap (as seen by the client and by the server).
+
+    python benchmarks/startup_bench.py --rfid 123456789 --cabin C1 --runs 5
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+APP = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "app.py")
+
+
+def get(url):
+    try:
+        with urllib.request.urlopen(url, timeout=2) as res:
+            return res.status, json.loads(res.read() or b"{}")
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read() or b"{}")
+
+
+def post(url, body):
+    req = urllib.request.Request(url, data=json.dumps(body).encode(), headers={"Content-Type": "application/json"})
+    try:
+        with urllib.request.urlopen(req, timeout=5) as res:
+            return res.status
+    except urllib.error.HTTPError as e:
+        return e.code
+
+
+def run_once(base, rfid, cabin, timeout):
+    start = time.monotonic()
+    proc = subprocess.Popen([sys.executable, APP], stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready_at = None
+        while time.monotonic() - start < timeout:
+            try:
+                status, _ = get(base + "/ready")
+                if status == 200:
+                    ready_at = time.monotonic() - start
+                    break
+            except (urllib.error.URLError, ConnectionError):
+                pass
+            time.sleep(0.02)
+        if ready_at is None:
+            raise RuntimeError("app did not become ready within %ss" % timeout)
+
+        tap_status = post(base + "/api/submit", {"RFID": rfid, "ID": cabin, "IN/OUT": "IN"})
+        first_tap_at = time.monotonic() - start
+        _, server = get(base + "/ready")
+        return {
+            "client_time_to_ready": round(ready_at, 4),
+            "client_time_to_first_tap": round(first_tap_at, 4),
+            "tap_status": tap_status,
+            "server_time_to_ready": server.get("time_to_ready"),
+            "server_time_to_first_tap": server.get("time_to_first_tap"),
+            "warmup_steps": server.get("warmup_steps"),
+        }
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--rfid", required=True)
+    parser.add_argument("--cabin", required=True)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    results = [run_once(args.base, args.rfid, args.cabin, args.timeout) for _ in range(args.runs)]
+    for r in results:
+        print(json.dumps(r))
+    ready = sorted(r["client_time_to_ready"] for r in results)
+    tap = sorted(r["client_time_to_first_tap"] for r in results)
+    print("median time to ready: %.4fs, median time to first tap: %.4fs" % (ready[len(ready) // 2], tap[len(tap) // 2]))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""
+Tap latency with and without heavy reports running. Sends taps at a fixed
+rate against a running server, first alone and then while --reports clients
+loop over /logs for a whole month (one request per day, no name filter), and
+prints tap p50/p99 plus how many report requests were admitted or got 429.
+
+    python benchmarks/tap_latency_under_reports.py --base http://127.0.0.1:8000 \\
+        --rfids 1,2,3 --cabin C1 --month 2025-09 --reports 20
+"""
+import argparse
+import calendar
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlparse
+
+
+def connect(base):
+    url = urlparse(base)
+    return http.client.HTTPConnection(url.hostname, url.port or 80, timeout=300)
+
+
+def tap_loop(base, rfids, cabin, rate, duration):
+    conn = connect(base)
+    latencies, interval = [], 1.0 / rate
+    deadline = time.monotonic() + duration
+    n = 0
+    while time.monotonic() < deadline:
+        body = json.dumps({"RFID": rfids[n % len(rfids)], "ID": cabin, "IN/OUT": "IN"})
+        start = time.monotonic()
+        conn.request("POST", "/api/submit", body=body, headers={"Content-Type": "application/json"})
+        conn.getresponse().read()
+        elapsed = time.monotonic() - start
+        latencies.append(elapsed)
+        n += 1
+        time.sleep(max(0.0, interval - elapsed))
+    return sorted(latencies)
+
+
+def report_loop(base, days, stop, counts):
+    conn = connect(base)
+    while not stop.is_set():
+        for day in days:
+            if stop.is_set():
+                return
+            conn.request("GET", "/logs?date=%s" % day)
+            res = conn.getresponse()
+            res.read()
+            counts[res.status] = counts.get(res.status, 0) + 1
+
+
+def percentile(values, p):
+    return values[max(0, int(len(values) * p) - 1)] * 1000 if values else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--base", default="http://127.0.0.1:8000")
+    parser.add_argument("--rfids", required=True)
+    parser.add_argument("--cabin", required=True)
+    parser.add_argument("--month", required=True, help="YYYY-MM")
+    parser.add_argument("--reports", type=int, default=20)
+    parser.add_argument("--rate", type=float, default=20, help="taps per second")
+    parser.add_argument("--duration", type=float, default=30)
+    args = parser.parse_args()
+
+    year, month = map(int, args.month.split("-"))
+    days = ["%04d-%02d-%02d" % (year, month, d) for d in range(1, calendar.monthrange(year, month)[1] + 1)]
+    rfids = args.rfids.split(",")
+
+    alone = tap_loop(args.base, rfids, args.cabin, args.rate, args.duration)
+    print("taps alone:         p50=%.1fms p99=%.1fms" % (percentile(alone, 0.5), percentile(alone, 0.99)))
+
+    stop, counts = threading.Event(), {}
+    reporters = [threading.Thread(target=report_loop, args=(args.base, days, stop, counts), daemon=True)
+                 for _ in range(args.reports)]
+    for t in reporters:
+        t.start()
+    loaded = tap_loop(args.base, rfids, args.cabin, args.rate, args.duration)
+    stop.set()
+    print("taps + %d reports: p50=%.1fms p99=%.1fms" % (
+        args.reports, percentile(loaded, 0.5), percentile(loaded, 0.99)))
+    print("report responses by status: %s" % counts)
+
+
+if __name__ == "__main__":
+    main()
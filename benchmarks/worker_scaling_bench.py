@@ -0,0 +1,96 @@
+"""
+Tap throughput vs worker count: starts workers.py with 1..N workers, drives
+/api/submit from concurrent clients for a fixed time and reports taps/second.
+Only 200s count as served taps; 404s (unknown card) and 429s (admission
+rejections) are reported next to them so they cannot inflate the rate.
+
+    python benchmarks/worker_scaling_bench.py --max-workers 4 --rfids 1,2,3 --cabin C1
+"""
+import argparse
+import collections
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+
+WORKERS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workers.py")
+
+
+def wait_ready(port, timeout):
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        try:
+            with urllib.request.urlopen("http://127.0.0.1:%d/ready" % port, timeout=2) as res:
+                if res.status == 200:
+                    return
+        except (urllib.error.URLError, ConnectionError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError("workers not ready within %ss" % timeout)
+
+
+def drive(port, rfids, cabin, duration, clients):
+    counts = [collections.Counter() for _ in range(clients)]
+    latencies = [[] for _ in range(clients)]
+    deadline = time.monotonic() + duration
+
+    def client(i):
+        conn = http.client.HTTPConnection("127.0.0.1", port)
+        n = 0
+        while time.monotonic() < deadline:
+            body = json.dumps({"RFID": rfids[(i + n) % len(rfids)], "ID": cabin, "IN/OUT": "IN"})
+            t = time.monotonic()
+            conn.request("POST", "/api/submit", body=body, headers={"Content-Type": "application/json"})
+            res = conn.getresponse()
+            res.read()
+            if res.status == 200:
+                latencies[i].append(time.monotonic() - t)
+            counts[i][res.status] += 1
+            n += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    lat = sorted(x for l in latencies for x in l)
+    p99 = lat[max(0, int(len(lat) * 0.99) - 1)] if lat else 0
+    statuses = sum(counts, collections.Counter())
+    return statuses[200] / duration, p99, statuses
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--rfids", required=True, help="comma separated RFIDs allowed on --cabin")
+    parser.add_argument("--cabin", required=True)
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+    rfids = args.rfids.split(",")
+
+    baseline = None
+    for n in range(1, args.max_workers + 1):
+        proc = subprocess.Popen([sys.executable, WORKERS, "--workers", str(n), "--port", str(args.port)],
+                                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            wait_ready(args.port, args.timeout)
+            rate, p99, statuses = drive(args.port, rfids, args.cabin, args.duration, args.clients)
+        finally:
+            proc.terminate()
+            proc.wait()
+        baseline = baseline or rate
+        other = sum(v for k, v in statuses.items() if k not in (200, 404, 429))
+        print("workers=%d  taps/s=%.1f  speedup=%.2fx  p99=%.1fms  404=%d  429=%d  other=%d" % (
+            n, rate, rate / baseline if baseline else 0, p99 * 1000, statuses[404], statuses[429], other))
+
+
+if __name__ == "__main__":
+    main()
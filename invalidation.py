@@ -0,0 +1,91 @@
+"""
+Cross-process cache invalidation over Unix datagram sockets.
+
+Every worker binds <directory>/worker-<pid>.sock and listens on it. publish()
+sends a small JSON message to every other socket in the directory, so each
+worker can drop or refresh its own in-process caches after a write made by a
+sibling. Messages are best-effort: a worker that died leaves a stale socket
+file, which is removed on the first failed send, and a message for a worker
+whose receive queue is full (it is busy or stopped) is dropped rather than
+waited for, so no request ever blocks on a sibling. Receivers must therefore
+bound their staleness some other way (app.py re-reads its lookup cache every
+LOOKUP_RESYNC_SECONDS and report cache entries expire).
+"""
+import glob
+import json
+import os
+import socket
+import threading
+
+MAX_MESSAGE = 64 * 1024
+
+
+class InvalidationBus:
+    def __init__(self, directory, handler, logger=None):
+        """
+        directory: shared directory all workers of one deployment use
+        handler: called with each decoded message dict received from other workers
+        """
+        self.directory = directory
+        self.handler = handler
+        self.logger = logger
+        self.path = os.path.join(directory, "worker-%d.sock" % os.getpid())
+        self._sock = None
+        self._send_sock = None
+        self._send_lock = threading.Lock()
+        self.dropped = 0
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(self.path)
+        self._send_sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        threading.Thread(target=self._listen, daemon=True).start()
+        return self
+
+    def stop(self):
+        if self._sock is not None:
+            self._sock.close()
+            self._sock = None
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def peers(self):
+        return [p for p in glob.glob(os.path.join(self.directory, "worker-*.sock")) if p != self.path]
+
+    def publish(self, message):
+        payload = json.dumps(message, default=str).encode()
+        if len(payload) > MAX_MESSAGE:
+            raise ValueError("invalidation message too large (%d bytes)" % len(payload))
+        with self._send_lock:
+            for peer in self.peers():
+                try:
+                    self._send_sock.sendto(payload, socket.MSG_DONTWAIT, peer)
+                except BlockingIOError:
+                    # Peer's queue is full (net.unix.max_dgram_qlen); never wait for it
+                    self.dropped += 1
+                    if self.logger:
+                        self.logger.warning("Invalidation queue of %s is full, message dropped", peer)
+                except (ConnectionRefusedError, FileNotFoundError):
+                    # Peer exited without cleaning up
+                    try:
+                        os.unlink(peer)
+                    except OSError:
+                        pass
+                except OSError as e:
+                    if self.logger:
+                        self.logger.warning("Invalidation send to %s failed: %s", peer, e)
+
+    def _listen(self):
+        while self._sock is not None:
+            try:
+                payload = self._sock.recv(MAX_MESSAGE)
+            except OSError:
+                return
+            try:
+                self.handler(json.loads(payload))
+            except Exception:
+                if self.logger:
+                    self.logger.exception("Invalidation handler failed for %r", payload[:200])
@@ -0,0 +1,135 @@
+"""
+MongoDB aggregation version of process_all_logs.
+
+The pipeline groups logs per (Name, RFID, date), pushes the events in time
+order and folds them with $reduce through the same IN/OUT state machine the
+Python path uses, so only one small row per person-day leaves the server.
+format_summary_row() turns those rows into the exact dicts /logs returns.
+"""
+from datetime import timedelta
+
+TIME_FORMAT = "%H:%M:%S"
+
+
+def _is_null(expr):
+    # $ifNull folds a missing field into null so both compare equal to None
+    return {"$eq": [{"$ifNull": [expr, None]}, None]}
+
+
+def _state(**changes):
+    """$reduce accumulator with some fields replaced; the rest are carried over from $$value."""
+    state = {f: "$$value." + f for f in ("in_t", "login", "logout", "total_ms", "errors")}
+    state.update(changes)
+    return state
+
+
+def _add_error(prefix):
+    return _state(errors={"$concatArrays": ["$$value.errors", [{"$concat": [prefix, "$$this.t"]}]]})
+
+
+def build_summary_pipeline(query):
+    """query: the same filter view_logs passes to find()"""
+    on_in = {"$cond": [
+        _is_null("$$value.in_t"),
+        {"$cond": [
+            _is_null("$$this.dt"),
+            _add_error("Bad IN datetime at "),
+            _state(in_t="$$this.dt", login={"$ifNull": ["$$value.login", "$$this.dt"]}),
+        ]},
+        _add_error("Duplicate IN at "),
+    ]}
+    on_out = {"$cond": [
+        {"$or": [_is_null("$$value.in_t"), _is_null("$$this.dt")]},
+        _add_error("Unexpected OUT at "),
+        _state(
+            in_t={"$literal": None},
+            logout="$$this.dt",
+            total_ms={"$add": ["$$value.total_ms", {"$subtract": ["$$this.dt", "$$value.in_t"]}]},
+        ),
+    ]}
+
+    return [
+        {"$match": query},
+        {"$sort": {"date": 1, "RFID": 1, "Name": 1, "time": 1, "_id": 1}},
+        {"$group": {
+            "_id": {
+                "name": {"$ifNull": ["$Name", ""]},
+                "rfid": {"$ifNull": ["$RFID", ""]},
+                "date": {"$ifNull": ["$date", ""]},
+            },
+            "events": {"$push": {
+                "a": {"$ifNull": ["$IN/OUT", ""]},
+                "t": {"$ifNull": ["$time", ""]},
+                "dt": {"$dateFromString": {
+                    "dateString": {"$concat": [{"$ifNull": ["$date", ""]}, " ", {"$ifNull": ["$time", ""]}]},
+                    "format": "%Y-%m-%d %H:%M:%S",
+                    "onError": None,
+                    "onNull": None,
+                }},
+            }},
+        }},
+        {"$project": {
+            "_id": 0,
+            "name": "$_id.name",
+            "rfid": "$_id.rfid",
+            "date": "$_id.date",
+            "state": {"$reduce": {
+                "input": "$events",
+                "initialValue": {"in_t": None, "login": None, "logout": None, "total_ms": 0, "errors": []},
+                "in": {"$switch": {
+                    "branches": [
+                        {"case": {"$eq": ["$$this.a", "IN"]}, "then": on_in},
+                        {"case": {"$eq": ["$$this.a", "OUT"]}, "then": on_out},
+                    ],
+                    "default": "$$value",
+                }},
+            }},
+        }},
+        {"$project": {
+            "name": 1,
+            "rfid": 1,
+            "date": 1,
+            "login_time": {"$cond": [_is_null("$state.login"), "",
+                                     {"$dateToString": {"format": TIME_FORMAT, "date": "$state.login"}}]},
+            "logout_time": {"$cond": [_is_null("$state.logout"), "",
+                                      {"$dateToString": {"format": TIME_FORMAT, "date": "$state.logout"}}]},
+            "total_ms": "$state.total_ms",
+            "span_ms": {"$cond": [
+                {"$or": [_is_null("$state.login"), _is_null("$state.logout")]},
+                None,
+                {"$subtract": ["$state.logout", "$state.login"]},
+            ]},
+            "errors": {"$cond": [
+                _is_null("$state.in_t"),
+                "$state.errors",
+                {"$concatArrays": ["$state.errors", [{"$concat": [
+                    "Missing OUT after ",
+                    {"$dateToString": {"format": TIME_FORMAT, "date": "$state.in_t"}},
+                ]}]]},
+            ]},
+        }},
+        {"$sort": {"date": 1, "name": 1, "rfid": 1}},
+    ]
+
+
+def format_summary_row(row):
+    """Pipeline row -> the summary dict process_all_logs builds for the same person-day."""
+    total_login = row["total_ms"] / 1000
+    span = row["span_ms"]
+    if span is not None:
+        total_break = span / 1000 - total_login
+        time_spent = str(timedelta(milliseconds=span))
+    else:
+        total_break = 0
+        time_spent = ""
+    return {
+        "name": row["name"],
+        "rfid": row["rfid"],
+        "date": row["date"],
+        "login_time": row["login_time"],
+        "logout_time": row["logout_time"],
+        "Effective_login": str(timedelta(seconds=total_login)) if total_login else "",
+        "Break_hours": str(timedelta(seconds=total_break)) if total_break else "",
+        "Total_login": time_spent,
+        "errors": row["errors"] if row["errors"] else "Absent",
+    }
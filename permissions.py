@@ -0,0 +1,88 @@
+"""
+Cabin permissions as bitmaps.
+
+Every cabin gets a dense integer "Bit" (allocated once from a counter and
+never reused). A user's allowed cabins are stored next to the Cabins array as
+Cabin_Bits: {"w0": Int64, "w1": Int64, ...}, 64 cabins per word, so a grant
+or revoke for a whole building/floor is one update_many with $bit per word
+instead of a rewrite per user. In memory a user's set is a plain Python int
+and "may RFID X open Y" is a dict lookup plus a shift.
+"""
+from bson.int64 import Int64
+from pymongo import ReturnDocument
+
+WORD_BITS = 64
+_WORD_MASK = (1 << WORD_BITS) - 1
+
+
+def _to_int64(word):
+    """Unsigned 64-bit word -> signed value BSON can store."""
+    return Int64(word - (1 << WORD_BITS) if word >= 1 << (WORD_BITS - 1) else word)
+
+
+def words(bitmap):
+    """Python int bitmap -> {word index: unsigned word} for the non-zero words."""
+    out = {}
+    i = 0
+    while bitmap:
+        if bitmap & _WORD_MASK:
+            out[i] = bitmap & _WORD_MASK
+        bitmap >>= WORD_BITS
+        i += 1
+    return out
+
+
+def encode_bits(bitmap):
+    return {"w%d" % i: _to_int64(w) for i, w in words(bitmap).items()}
+
+
+def decode_bits(stored):
+    bitmap = 0
+    for key, word in (stored or {}).items():
+        bitmap |= (int(word) & _WORD_MASK) << (WORD_BITS * int(key[1:]))
+    return bitmap
+
+
+def bit_update(bitmap, op):
+    """$bit update document that ORs ("or") or clears ("and") the given bits on Cabin_Bits."""
+    update = {}
+    for i, w in words(bitmap).items():
+        value = w if op == "or" else ~w & _WORD_MASK
+        update["Cabin_Bits.w%d" % i] = {op: _to_int64(value)}
+    return update
+
+
+class CabinIndex:
+    """Cabin "ID" <-> dense bit number."""
+
+    def __init__(self):
+        self.bit_by_id = {}
+
+    def load(self, cabins):
+        self.bit_by_id = {c.get("ID"): c["Bit"] for c in cabins if c.get("Bit") is not None}
+
+    def bit(self, cabin_id):
+        return self.bit_by_id.get(cabin_id)
+
+    def bitmap_for(self, cabin_ids):
+        bitmap = 0
+        for cabin_id in cabin_ids or []:
+            b = self.bit_by_id.get(cabin_id)
+            if b is not None:
+                bitmap |= 1 << b
+        return bitmap
+
+    def allows(self, bitmap, cabin_id):
+        b = self.bit_by_id.get(cabin_id)
+        return b is not None and (bitmap >> b) & 1 == 1
+
+
+def assign_cabin_bits(cabin_collection, counters_collection):
+    """Give every cabin without a Bit the next number from the shared counter. Safe across workers."""
+    for cabin in cabin_collection.find({"Bit": {"$exists": False}}, {"_id": 1}):
+        counter = counters_collection.find_one_and_update(
+            {"_id": "cabin_bit"}, {"$inc": {"seq": 1}}, upsert=True, return_document=ReturnDocument.AFTER
+        )
+        # If another worker got there first its number stands and ours is simply left unused
+        cabin_collection.update_one({"_id": cabin["_id"], "Bit": {"$exists": False}},
+                                    {"$set": {"Bit": counter["seq"] - 1}})
@@ -0,0 +1,154 @@
+"""
+On-demand profiling for production.
+
+SamplingProfiler walks sys._current_frames() of every thread at a fixed
+interval for N seconds and writes collapsed stacks ("frame;frame;frame count"
+per line), the input format of flamegraph.pl and speedscope. The time spent
+sampling is measured on every tick and the interval is stretched whenever it
+would exceed the overhead budget.
+
+RequestProfiler runs cProfile around a single request. Up to Python 3.11
+cProfile only traces the thread that enabled it; from 3.12 it is process-wide.
+Either way captures run one at a time and are rate limited, so a client
+cannot keep it switched on.
+"""
+import cProfile
+import math
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def positive_number(value, name):
+    """value as a float; ValueError unless it is a finite number > 0 (bools and numeric strings are rejected)."""
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or not math.isfinite(value) or value <= 0:
+        raise ValueError("%s must be a positive number" % name)
+    return float(value)
+
+
+def _frame_label(frame):
+    code = frame.f_code
+    return "%s (%s:%d)" % (code.co_name, os.path.basename(code.co_filename), code.co_firstlineno)
+
+
+class SamplingProfiler:
+    MIN_INTERVAL = 0.001
+    MAX_INTERVAL = 1.0
+
+    def __init__(self, out_dir, interval=0.005, overhead_budget=0.02, max_seconds=60):
+        """
+        interval: seconds between samples when within budget
+        overhead_budget: max fraction of wall time the sampler may spend walking stacks
+        """
+        self.out_dir = out_dir
+        self.interval = interval
+        self.overhead_budget = overhead_budget
+        self.max_seconds = max_seconds
+        self._lock = threading.Lock()
+        self.running = None
+        self.last = None
+
+    def start(self, seconds, interval=None):
+        """
+        Start a capture in the background; returns the output path. seconds is capped at
+        max_seconds and interval clamped to [MIN_INTERVAL, MAX_INTERVAL] (and to seconds).
+        ValueError on a bad argument, RuntimeError if a capture is already running.
+        """
+        seconds = min(positive_number(seconds, "seconds"), self.max_seconds)
+        if interval is None:
+            interval = self.interval
+        else:
+            interval = min(max(positive_number(interval, "interval"), self.MIN_INTERVAL), self.MAX_INTERVAL, seconds)
+        with self._lock:
+            if self.running:
+                raise RuntimeError("a capture is already running")
+            os.makedirs(self.out_dir, exist_ok=True)
+            path = os.path.join(self.out_dir, "stacks-%s-%d.collapsed" % (time.strftime("%Y%m%d-%H%M%S"), os.getpid()))
+            self.running = {"file": path, "seconds": seconds, "interval_ms": interval * 1000, "started": time.time()}
+        threading.Thread(target=self._run, args=(path, seconds, interval), name="sampling-profiler", daemon=True).start()
+        return path
+
+    def _run(self, path, seconds, interval):
+        own = threading.get_ident()
+        counts = Counter()
+        names = {}
+        samples = 0
+        busy = 0.0
+        start = time.perf_counter()
+        end = start + seconds
+        try:
+            while True:
+                t0 = time.perf_counter()
+                if t0 >= end:
+                    break
+                if samples % 100 == 0:
+                    names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own:
+                        continue
+                    stack = []
+                    while frame is not None:
+                        stack.append(_frame_label(frame))
+                        frame = frame.f_back
+                    stack.append(names.get(ident, "thread-%d" % ident).replace(";", ":"))
+                    counts[";".join(reversed(stack))] += 1
+                samples += 1
+                cost = time.perf_counter() - t0
+                busy += cost
+                # Stretch the interval so cost / interval stays inside the budget
+                time.sleep(max(interval, cost / self.overhead_budget) - cost)
+        finally:
+            elapsed = time.perf_counter() - start
+            with open(path, "w") as f:
+                for stack, n in counts.most_common():
+                    f.write("%s %d\n" % (stack, n))
+            with self._lock:
+                self.last = dict(self.running, samples=samples, duration=round(elapsed, 3),
+                                 overhead=round(busy / elapsed, 5) if elapsed else 0.0)
+                self.running = None
+
+    def status(self):
+        with self._lock:
+            return {"running": self.running, "last": self.last}
+
+
+class RequestProfiler:
+    def __init__(self, out_dir, per_minute=6, max_concurrent=1):
+        self.out_dir = out_dir
+        self.per_minute = per_minute
+        self.max_concurrent = max_concurrent
+        self._lock = threading.Lock()
+        self._recent = []
+        self._active = 0
+
+    def begin(self):
+        """Returns an enabled cProfile.Profile, or None when over the rate/concurrency limit."""
+        now = time.monotonic()
+        with self._lock:
+            self._recent = [t for t in self._recent if now - t < 60]
+            if len(self._recent) >= self.per_minute or self._active >= self.max_concurrent:
+                return None
+            self._recent.append(now)
+            self._active += 1
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Python 3.12+: only one cProfile may be active per process
+            with self._lock:
+                self._active -= 1
+            return None
+        return profile
+
+    def end(self, profile, label):
+        """Stop the capture and dump it as a .prof file (pstats/snakeviz); returns the path."""
+        profile.disable()
+        with self._lock:
+            self._active -= 1
+        os.makedirs(self.out_dir, exist_ok=True)
+        path = os.path.join(self.out_dir, "request-%s-%s-%d.prof" % (
+            label, time.strftime("%Y%m%d-%H%M%S"), threading.get_ident()))
+        profile.dump_stats(path)
+        return path
@@ -0,0 +1,241 @@
+"""
+Parity between the /logs engines without a MongoDB server.
+
+build_summary_pipeline() is run over fixed log fixtures by a small interpreter
+for the stages and operators it uses ($match equality, $sort, $group/$push,
+$project, $reduce, $switch, $cond, $ifNull, $dateFromString, ...). Missing
+fields are kept distinct from null, as on the server. The formatted rows are
+compared with process_all_logs over the same logs.
+
+    python -m pytest tests/test_log_pipeline_parity.py
+    python tests/test_log_pipeline_parity.py
+"""
+import os
+import sys
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app  # noqa: E402
+
+MISSING = object()
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return MISSING
+        doc = doc[part]
+    return doc
+
+
+def _null(value):
+    return value is MISSING or value is None
+
+
+def evaluate(expr, doc, variables):
+    if isinstance(expr, str):
+        if expr.startswith("$$"):
+            name, _, rest = expr[2:].partition(".")
+            return _get(variables[name], rest) if rest else variables[name]
+        if expr.startswith("$"):
+            return _get(doc, expr[1:])
+        return expr
+    if isinstance(expr, list):
+        return [evaluate(e, doc, variables) for e in expr]
+    if not isinstance(expr, dict):
+        return expr
+    if len(expr) == 1 and next(iter(expr)).startswith("$"):
+        op, arg = next(iter(expr.items()))
+        ev = lambda e: evaluate(e, doc, variables)  # noqa: E731
+        if op == "$literal":
+            return arg
+        if op == "$eq":
+            a, b = ev(arg)
+            return (a is MISSING) == (b is MISSING) and a == b
+        if op == "$ifNull":
+            value = ev(arg[0])
+            return ev(arg[1]) if _null(value) else value
+        if op == "$concat":
+            parts = ev(arg)
+            return None if any(_null(p) for p in parts) else "".join(parts)
+        if op == "$concatArrays":
+            return [x for part in ev(arg) for x in part]
+        if op == "$cond":
+            return ev(arg[1]) if ev(arg[0]) else ev(arg[2])
+        if op == "$or":
+            return any(ev(a) for a in arg)
+        if op == "$add":
+            return sum(ev(arg))
+        if op == "$subtract":
+            a, b = ev(arg)
+            return int((a - b).total_seconds() * 1000) if isinstance(a, datetime) else a - b
+        if op == "$switch":
+            for branch in arg["branches"]:
+                if ev(branch["case"]):
+                    return ev(branch["then"])
+            return ev(arg["default"])
+        if op == "$reduce":
+            acc = ev(arg["initialValue"])
+            for item in ev(arg["input"]):
+                acc = evaluate(arg["in"], doc, dict(variables, value=acc, this=item))
+            return acc
+        if op == "$dateFromString":
+            text = ev(arg["dateString"])
+            if _null(text):
+                return arg["onNull"]
+            try:
+                return datetime.strptime(text, arg["format"])
+            except ValueError:
+                return arg["onError"]
+        if op == "$dateToString":
+            value = ev(arg["date"])
+            return None if _null(value) else value.strftime(arg["format"])
+        raise NotImplementedError(op)
+    out = {}
+    for key, value in expr.items():
+        result = evaluate(value, doc, variables)
+        if result is not MISSING:
+            out[key] = result
+    return out
+
+
+def _sort_key(value):
+    # BSON order for what the fixtures contain: missing/null < numbers < strings
+    if _null(value):
+        return (0, 0)
+    return (1, value) if isinstance(value, (int, float)) else (2, value)
+
+
+def aggregate(docs, pipeline):
+    for stage in pipeline:
+        (op, arg), = stage.items()
+        if op == "$match":
+            docs = [d for d in docs if all(_get(d, k) == v for k, v in arg.items())]
+        elif op == "$sort":
+            for field, direction in reversed(list(arg.items())):
+                docs = sorted(docs, key=lambda d: _sort_key(_get(d, field)), reverse=direction < 0)
+        elif op == "$group":
+            groups = {}
+            for d in docs:
+                group_id = evaluate(arg["_id"], d, {})
+                group = groups.setdefault(repr(sorted(group_id.items())), {"_id": group_id})
+                for field, acc in arg.items():
+                    if field != "_id":
+                        group.setdefault(field, []).append(evaluate(acc["$push"], d, {}))
+            docs = list(groups.values())
+        elif op == "$project":
+            projected = []
+            for d in docs:
+                row = {}
+                for field, spec in arg.items():
+                    if spec == 0:
+                        continue
+                    value = _get(d, field) if spec == 1 else evaluate(spec, d, {})
+                    if value is not MISSING:
+                        row[field] = value
+                projected.append(row)
+            docs = projected
+        else:
+            raise NotImplementedError(op)
+    return docs
+
+
+def log(name, rfid, action, time, date="2025-09-08"):
+    return {"Name": name, "RFID": rfid, "date": date, "time": time, "IN/OUT": action, "Log_Cabin": "L1"}
+
+
+FIXTURES = [
+    # normal day with a break
+    log("alice", "1", "IN", "09:00:00"), log("alice", "1", "OUT", "12:00:00"),
+    log("alice", "1", "IN", "13:00:00"), log("alice", "1", "OUT", "18:00:00"),
+    # duplicate IN
+    log("bob", "2", "IN", "08:00:00"), log("bob", "2", "IN", "08:05:00"), log("bob", "2", "OUT", "17:00:00"),
+    # unexpected OUT first, then a pair
+    log("carol", "3", "OUT", "07:00:00"), log("carol", "3", "IN", "09:30:00"), log("carol", "3", "OUT", "10:00:00"),
+    # missing OUT
+    log("dave", "4", "IN", "10:00:00"), log("dave", "4", "OUT", "11:00:00"), log("dave", "4", "IN", "14:15:16"),
+    # bad time on IN and on OUT, plus an unknown action
+    log("erin", "5", "IN", "9am"), log("erin", "5", "IN", "09:00:00"), log("erin", "5", "X", "10:00:00"),
+    log("erin", "5", "OUT", "25:00:00"), log("erin", "5", "OUT", "11:00:00"),
+    # log without a Name field
+    {"RFID": "6", "date": "2025-09-08", "time": "09:00:00", "IN/OUT": "IN"},
+    # other day, filtered out by the query
+    log("alice", "1", "IN", "09:00:00", date="2025-09-09"),
+]
+
+
+class FixtureCollection:
+    """Stands in for batch_logs_collection so summarize_logs_pipeline runs unchanged."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.last_rows = []
+
+    def aggregate(self, pipeline, allowDiskUse=False):
+        self.last_rows = aggregate([dict(d) for d in self.docs], pipeline)
+        return iter(self.last_rows)
+
+
+def run_both(query, names=None, rfids=None, date=None):
+    docs = [dict(d, _id=i) for i, d in enumerate(FIXTURES)]
+
+    expected = {}
+    matching = [dict(d) for d in docs if all(d.get(k) == v for k, v in query.items())]
+    app.process_all_logs(matching, expected, names, rfids, date, None)
+
+    fixtures = FixtureCollection(docs)
+    actual = {}
+    original, app.batch_logs_collection = app.batch_logs_collection, fixtures
+    try:
+        app.summarize_logs_pipeline(query, actual, names, rfids, date, None)
+    finally:
+        app.batch_logs_collection = original
+    return expected["summary"], actual["summary"], len(fixtures.last_rows)
+
+
+def key(row):
+    return (row["date"], row["name"], row["rfid"])
+
+
+def test_summaries_match_process_all_logs():
+    expected, actual, n_present = run_both({"date": "2025-09-08"}, date="2025-09-08")
+    assert n_present == 6
+    assert sorted(actual, key=key) == sorted(expected, key=key)
+
+
+def test_error_strings_match():
+    expected, actual, _ = run_both({"date": "2025-09-08"}, date="2025-09-08")
+    errors = {r["name"]: r["errors"] for r in actual}
+    assert errors["alice"] == "Absent"
+    assert errors["bob"] == ["Duplicate IN at 08:05:00"]
+    assert errors["carol"] == ["Unexpected OUT at 07:00:00"]
+    assert errors["dave"] == ["Missing OUT after 14:15:16"]
+    # times sort as strings, so "25:00:00" comes before "9am"
+    assert errors["erin"] == ["Unexpected OUT at 25:00:00", "Bad IN datetime at 9am"]
+    assert errors == {r["name"]: r["errors"] for r in expected}
+
+
+def test_pipeline_rows_are_sorted_and_absent_rows_follow_in_query_order():
+    names = ["zed", "alice", "yan"]
+    expected, actual, n_present = run_both({"date": "2025-09-08", "Name": "alice"}, names=names, date="2025-09-08")
+    present = actual[:n_present]
+    assert present == sorted(present, key=key)
+    # Absent rows are appended after the present ones, in query order, by both engines
+    assert [r["name"] for r in actual[n_present:]] == ["zed", "yan"]
+    assert actual[n_present:] == expected[len(expected) - 2:]
+    assert sorted(actual, key=key) == sorted(expected, key=key)
+
+
+def test_no_logs_gives_identical_absent_rows():
+    expected, actual, n_present = run_both({"date": "2030-01-01"}, names=["alice", "bob"], rfids=["1", "2"],
+                                           date="2030-01-01")
+    assert n_present == 0
+    assert actual == expected
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
@@ -0,0 +1,276 @@
+"""
+Cabin permission bitmaps and the bulk grant/revoke routes without a MongoDB server.
+
+The encoding tests cover the signed Int64 wrap at bit 63 and the word boundary
+at bit 64. The route tests run /permissions/grant and /permissions/revoke
+against small in-memory collections whose $bit applies the same signed 64-bit
+and/or the server does, and check that Cabin_Bits always ends up equal to the
+bitmap of the Cabins array.
+
+    python -m pytest tests/test_permissions.py
+    python tests/test_permissions.py
+"""
+import copy
+import os
+import sys
+from contextlib import contextmanager
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bson.int64 import Int64  # noqa: E402
+
+import app  # noqa: E402
+from permissions import CabinIndex, bit_update, decode_bits, encode_bits  # noqa: E402
+
+INT64_MIN, INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _get(doc, path):
+    for part in path.split("."):
+        if not isinstance(doc, dict) or part not in doc:
+            return None
+        doc = doc[part]
+    return doc
+
+
+def _set(doc, path, value):
+    *parents, last = path.split(".")
+    for part in parents:
+        doc = doc.setdefault(part, {})
+    doc[last] = value
+
+
+def matches(doc, query):
+    for field, cond in query.items():
+        value = doc.get(field)
+        if isinstance(cond, dict) and "$exists" in cond:
+            if (field in doc) != cond["$exists"]:
+                return False
+        elif isinstance(cond, dict) and "$in" in cond:
+            values = value if isinstance(value, list) else [value]
+            if not any(v in cond["$in"] for v in values):
+                return False
+        elif value != cond and not (isinstance(value, list) and cond in value):
+            return False
+    return True
+
+
+def apply_update(doc, update):
+    for op, fields in update.items():
+        for path, arg in fields.items():
+            if op == "$set":
+                _set(doc, path, arg)
+            elif op == "$addToSet":
+                values = doc.setdefault(path, [])
+                values.extend(v for v in arg["$each"] if v not in values)
+            elif op == "$pull":
+                doc[path] = [v for v in doc.get(path, []) if v not in arg["$in"]]
+            elif op == "$bit":
+                # Python ints are two's complement, so this is the server's signed 64-bit and/or
+                (bit_op, operand), = arg.items()
+                current = int(_get(doc, path) or 0)
+                result = current | int(operand) if bit_op == "or" else current & int(operand)
+                assert INT64_MIN <= result <= INT64_MAX
+                _set(doc, path, Int64(result))
+            else:
+                raise NotImplementedError(op)
+
+
+class Result:
+    def __init__(self, matched_count=0, modified_count=0):
+        self.matched_count = matched_count
+        self.modified_count = modified_count
+
+
+class FakeCollection:
+    """The part of a pymongo collection the permission code uses, over a list of dicts."""
+
+    def __init__(self, docs=()):
+        self.docs = [copy.deepcopy(d) for d in docs]
+
+    def find(self, query=None, projection=None):
+        return [copy.deepcopy(d) for d in self.docs if matches(d, query or {})]
+
+    def find_one(self, query=None, projection=None):
+        found = self.find(query)
+        return found[0] if found else None
+
+    def update_one(self, query, update, upsert=False):
+        for doc in self.docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                apply_update(doc, update)
+                return Result(1, int(doc != before))
+        return Result()
+
+    def update_many(self, query, update):
+        result = Result()
+        for doc in self.docs:
+            if matches(doc, query):
+                before = copy.deepcopy(doc)
+                apply_update(doc, update)
+                result.matched_count += 1
+                result.modified_count += int(doc != before)
+        return result
+
+    def bulk_write(self, requests, ordered=True):
+        for op in requests:
+            self.update_one(op._filter, op._doc)
+
+
+CABINS = [
+    {"_id": 0, "ID": "C0", "Floor": "1", "Bit": 0},
+    {"_id": 1, "ID": "C1", "Floor": "1", "Bit": 1},
+    {"_id": 63, "ID": "C63", "Floor": "2", "Bit": 63},
+    {"_id": 64, "ID": "C64", "Floor": "2", "Bit": 64},
+]
+
+
+def index():
+    cabin_index = CabinIndex()
+    cabin_index.load(CABINS)
+    return cabin_index
+
+
+def user(rfid, cabins, bits=None):
+    doc = {"_id": rfid, "Name": rfid.lower(), "RFID": rfid, "Cabins": list(cabins)}
+    if bits is not None:
+        doc["Cabin_Bits"] = encode_bits(bits)
+    return doc
+
+
+def consistent(users):
+    """Every user's stored bitmap equals the bitmap of its Cabins array."""
+    cabin_index = index()
+    return all(decode_bits(u.get("Cabin_Bits")) == cabin_index.bitmap_for(u.get("Cabins")) for u in users.docs)
+
+
+@contextmanager
+def fake_db(users):
+    fakes = {"collection": FakeCollection(users), "cabin_collection": FakeCollection(CABINS),
+             "counters_collection": FakeCollection()}
+    originals = {name: getattr(app, name) for name in fakes}
+    for name, fake in fakes.items():
+        setattr(app, name, fake)
+    try:
+        yield app.create_app(warm=False).test_client(), fakes["collection"]
+    finally:
+        for name, original in originals.items():
+            setattr(app, name, original)
+
+
+# ---------- encoding ----------
+def test_round_trip_across_word_boundaries():
+    for bits in ([], [0], [62], [63], [64], [0, 63, 64, 127], [127, 128], [63, 127, 191, 200]):
+        bitmap = sum(1 << b for b in bits)
+        stored = encode_bits(bitmap)
+        assert decode_bits(stored) == bitmap
+        assert all(isinstance(w, Int64) and INT64_MIN <= w <= INT64_MAX for w in stored.values())
+
+
+def test_bit_63_wraps_to_negative_int64():
+    assert encode_bits(0) == {}
+    assert encode_bits(1 << 63) == {"w0": Int64(INT64_MIN)}
+    assert encode_bits(1 << 64) == {"w1": Int64(1)}
+    assert encode_bits((1 << 64) - 1) == {"w0": Int64(-1)}
+    assert decode_bits({"w0": Int64(-1)}) == (1 << 64) - 1
+
+
+def test_bit_update_only_touches_words_in_the_mask():
+    assert bit_update(1 << 63, "or") == {"Cabin_Bits.w0": {"or": Int64(INT64_MIN)}}
+    assert bit_update(1 << 63, "and") == {"Cabin_Bits.w0": {"and": Int64(INT64_MAX)}}
+    assert bit_update(1 << 64, "and") == {"Cabin_Bits.w1": {"and": Int64(-2)}}
+
+
+def test_bit_update_or_and_keep_other_bits():
+    doc = {"Cabin_Bits": encode_bits(sum(1 << b for b in (1, 63, 64, 127)))}
+    apply_update(doc, {"$bit": bit_update(sum(1 << b for b in (62, 63, 128)), "or")})
+    assert decode_bits(doc["Cabin_Bits"]) == sum(1 << b for b in (1, 62, 63, 64, 127, 128))
+    apply_update(doc, {"$bit": bit_update(sum(1 << b for b in (63, 64)), "and")})
+    assert decode_bits(doc["Cabin_Bits"]) == sum(1 << b for b in (1, 62, 127, 128))
+
+
+def test_cabin_index():
+    cabin_index = index()
+    bitmap = cabin_index.bitmap_for(["C63", "C64", "unknown"])
+    assert bitmap == (1 << 63) | (1 << 64)
+    assert cabin_index.allows(bitmap, "C63") and cabin_index.allows(bitmap, "C64")
+    assert not cabin_index.allows(bitmap, "C0") and not cabin_index.allows(bitmap, "unknown")
+
+
+# ---------- bulk grant / revoke ----------
+def test_grant_selected_users_across_word_boundary():
+    with fake_db([user("A", ["C0"], 1), user("B", ["C1"], 2)]) as (client, users):
+        res = client.post("/permissions/grant", json={"Floor": "2", "RFIDs": ["A"]})
+        assert res.status_code == 200 and res.json["matched"] == 1
+        a, b = users.find_one({"RFID": "A"}), users.find_one({"RFID": "B"})
+        assert sorted(a["Cabins"]) == ["C0", "C63", "C64"]
+        assert b["Cabins"] == ["C1"]
+        assert consistent(users)
+
+
+def test_revoke_keeps_other_cabins():
+    with fake_db([user("A", ["C0", "C1", "C63", "C64"], 0b11 | (1 << 63) | (1 << 64))]) as (client, users):
+        res = client.post("/permissions/revoke", json={"ID": ["C63", "C64"], "RFIDs": "A"})
+        assert res.status_code == 200
+        assert users.find_one({"RFID": "A"})["Cabins"] == ["C0", "C1"]
+        assert decode_bits(users.find_one({"RFID": "A"})["Cabin_Bits"]) == 0b11
+
+
+def test_user_selector_is_required():
+    with fake_db([user("A", ["C0"], 1)]) as (client, users):
+        for body in ({"ID": "C1"}, {"ID": "C1", "RFIDs": []}, {"ID": "C1", "all": "yes"}):
+            assert client.post("/permissions/grant", json=body).status_code == 400
+        assert users.find_one({"RFID": "A"})["Cabins"] == ["C0"]
+
+
+def test_all_selects_every_user():
+    with fake_db([user("A", ["C0"], 1), user("B", [], 0)]) as (client, users):
+        res = client.post("/permissions/grant", json={"ID": "C63", "all": True})
+        assert res.json["matched"] == 2
+        assert all("C63" in u["Cabins"] for u in users.docs)
+        assert consistent(users)
+
+
+def test_unknown_cabin_selector():
+    with fake_db([user("A", ["C0"], 1)]) as (client, _):
+        assert client.post("/permissions/grant", json={"RFIDs": ["A"]}).status_code == 400
+        assert client.post("/permissions/grant", json={"ID": "nope", "RFIDs": ["A"]}).status_code == 404
+
+
+def test_stale_and_missing_bits_are_reconciled_before_bit_update():
+    # A: Cabins edited outside the app (bitmap still says C63); B: created before bitmaps existed
+    with fake_db([user("A", ["C0"], 1 << 63), user("B", ["C1", "C64"])]) as (client, users):
+        assert client.post("/permissions/grant", json={"ID": "C1", "all": True}).status_code == 200
+        assert consistent(users)
+        assert not index().allows(decode_bits(users.find_one({"RFID": "A"})["Cabin_Bits"]), "C63")
+
+
+# ---------- reconcile ----------
+def test_reconcile_rewrites_only_mismatched_users():
+    with fake_db([user("A", ["C0"], 1), user("B", ["C1"], 1), user("C", ["C64"])]) as (_, users):
+        assert app.reconcile_cabin_bits(index=index()) == 2
+        assert consistent(users)
+        assert app.reconcile_cabin_bits(index=index()) == 0
+
+
+def test_reconcile_does_not_undo_a_concurrent_change():
+    class Racing(FakeCollection):
+        def find(self, query=None, projection=None):
+            found = super().find(query, projection)
+            # A grant lands between the read and the conditional write
+            self.update_one({"RFID": "A"}, {"$addToSet": {"Cabins": {"$each": ["C1"]}},
+                                            "$bit": bit_update(1 << 1, "or")})
+            return found
+
+    with fake_db([]) as (_, _users):
+        racing = app.collection = Racing([user("A", ["C0"], 1 << 63)])
+        app.reconcile_cabin_bits(index=index())
+        assert decode_bits(racing.find_one({"RFID": "A"})["Cabin_Bits"]) == (1 << 63) | (1 << 1)
+
+
+if __name__ == "__main__":
+    for name, fn in list(globals().items()):
+        if name.startswith("test_"):
+            fn()
+            print("ok", name)
@@ -0,0 +1,190 @@
+"""
+Multi-process runner.
+
+    python workers.py --workers 4 --port 8000
+
+Starts N app.py worker processes on port+1 .. port+N and a small HTTP front on
+--port. Each worker keeps its own caches (user lookup, report cache) and they
+invalidate each other through a shared directory of Unix sockets (see
+invalidation.py). The front routes /api/submit by a hash of the RFID so every
+tap for one card lands on the same worker, where the tap lock keeps them in
+order; all other routes are spread round-robin.
+"""
+import argparse
+import http.client
+import itertools
+import json
+import os
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+APP = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+# Safe to resend after the worker may already have handled them
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS"}
+HOP_BY_HOP = {"connection", "keep-alive", "transfer-encoding", "te", "trailer", "upgrade",
+              "proxy-authorization", "proxy-authenticate"}
+
+
+def worker_for_rfid(rfid, n_workers):
+    """Stable RFID -> worker index mapping."""
+    return zlib.crc32(str(rfid).encode()) % n_workers
+
+
+class Supervisor:
+    def __init__(self, n_workers, base_port, invalidation_dir):
+        self.n_workers = n_workers
+        self.ports = [base_port + 1 + i for i in range(n_workers)]
+        self.invalidation_dir = invalidation_dir
+        self.procs = [None] * n_workers
+        self.stopping = False
+
+    def spawn(self, index):
+        # Workers are reachable through the router, so the debugger is never on here
+        env = dict(os.environ, PORT=str(self.ports[index]), INVALIDATION_DIR=self.invalidation_dir, FLASK_DEBUG="0")
+        self.procs[index] = subprocess.Popen([sys.executable, APP], env=env)
+
+    def start(self):
+        for i in range(self.n_workers):
+            self.spawn(i)
+        threading.Thread(target=self._watch, daemon=True).start()
+
+    def _watch(self):
+        while not self.stopping:
+            for i, proc in enumerate(self.procs):
+                if proc.poll() is not None and not self.stopping:
+                    print("Worker %d (port %d) exited with %s, restarting" % (i, self.ports[i], proc.returncode))
+                    self.spawn(i)
+            time.sleep(1)
+
+    def stop(self):
+        self.stopping = True
+        for proc in self.procs:
+            if proc and proc.poll() is None:
+                proc.terminate()
+        for proc in self.procs:
+            if proc:
+                proc.wait()
+
+
+def make_handler(ports):
+    round_robin = itertools.cycle(range(len(ports)))
+    local = threading.local()
+
+    def connection(index):
+        conns = getattr(local, "conns", None)
+        if conns is None:
+            conns = local.conns = {}
+        if index not in conns:
+            conns[index] = http.client.HTTPConnection("127.0.0.1", ports[index], timeout=300)
+        return conns[index]
+
+    class RouterHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _pick_worker(self, body):
+            if self.path.startswith("/api/submit"):
+                try:
+                    rfid = json.loads(body or b"{}").get("RFID")
+                except (ValueError, AttributeError):
+                    rfid = None
+                if rfid:
+                    return worker_for_rfid(rfid, len(ports))
+            return next(round_robin)
+
+        def _reply(self, status, body, headers=()):
+            self.send_response(status)
+            for k, v in headers:
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _ready(self):
+            statuses = []
+            for i in range(len(ports)):
+                try:
+                    conn = connection(i)
+                    conn.request("GET", "/ready")
+                    res = conn.getresponse()
+                    statuses.append({"port": ports[i], "status": res.status, "body": json.loads(res.read() or b"{}")})
+                except (OSError, http.client.HTTPException, ValueError):
+                    local.conns.pop(i, None)
+                    statuses.append({"port": ports[i], "status": 503})
+            ok = all(s["status"] == 200 for s in statuses)
+            body = json.dumps({"status": "ready" if ok else "starting", "workers": statuses}).encode()
+            self._reply(200 if ok else 503, body, [("Content-Type", "application/json")])
+
+        def _forward(self):
+            if self.path == "/ready":
+                self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                return self._ready()
+
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            index = self._pick_worker(body)
+            headers = {k: v for k, v in self.headers.items() if k.lower() not in HOP_BY_HOP}
+            for attempt in range(2):
+                conn = connection(index)
+                sent = False
+                try:
+                    conn.request(self.command, self.path, body=body or None, headers=headers)
+                    sent = True
+                    res = conn.getresponse()
+                    data = res.read()
+                    break
+                except (OSError, http.client.HTTPException):
+                    # Stale keep-alive connection or worker restarting. Once a POST/PUT/DELETE
+                    # has been sent the worker may have acted on it, so it is never resent.
+                    conn.close()
+                    local.conns.pop(index, None)
+                    if attempt or (sent and self.command not in IDEMPOTENT_METHODS):
+                        return self._reply(502, b'{"status": "error", "message": "Worker unavailable"}',
+                                           [("Content-Type", "application/json")])
+            self._reply(res.status, data,
+                        [(k, v) for k, v in res.getheaders() if k.lower() not in HOP_BY_HOP | {"content-length"}])
+
+        do_GET = do_POST = do_PUT = do_DELETE = do_OPTIONS = _forward
+
+    return RouterHandler
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    invalidation_dir = tempfile.mkdtemp(prefix="transaction-workers-")
+    supervisor = Supervisor(args.workers, args.port, invalidation_dir)
+    supervisor.start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(supervisor.ports))
+    server.daemon_threads = True
+
+    def shutdown(signum, frame):
+        threading.Thread(target=server.shutdown).start()
+
+    signal.signal(signal.SIGTERM, shutdown)
+    print("Routing :%d -> workers on %s" % (args.port, supervisor.ports))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        supervisor.stop()
+        shutil.rmtree(invalidation_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()